@@ -0,0 +1,78 @@
+"""Benchmark HTMLCleanser against LXMLCleanser on large table-heavy pages.
+
+Run it inside the html_splitter directory:
+
+    python -m benchmarks.cleanser --n_tables 50 100 200 --n_rows 50
+"""
+import argparse
+import random
+import time
+
+from bs4 import BeautifulSoup
+from loguru import logger
+
+from splitter.cleanser import HTMLCleanser, LXMLCleanser
+
+
+def make_table_page(n_tables: int, n_rows: int, n_cols: int = 6, seed: int = 0) -> str:
+    """Make a page of tables decorated with the invalid tags and attributes, as crawled pages are."""
+    rand = random.Random(seed)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+    tables = []
+    for i in range(n_tables):
+        rows = [
+            "<tr>" + "".join(f'<th class="head" style="width:10%">Header {j}</th>' for j in range(n_cols)) + "</tr>"
+        ]
+        for _ in range(n_rows):
+            cells = []
+            for _ in range(n_cols):
+                text = " ".join(rand.choice(words) for _ in range(rand.randint(1, 6)))
+                attrs = rand.choice(["", ' colspan="2"', ' rowspan="2"', ' class="cell" id="c"'])
+                inner = rand.choice(
+                    [text, f"<span>{text}</span>", f'<a href="#">{text}</a>', "<div><span></span></div>"]
+                )
+                cells += [f"<td{attrs}>{inner}</td>"]
+            rows += ['<tr class="row">' + "".join(cells) + "</tr>"]
+        tables += [
+            f'<div class="wrapper"><p>Table {i}</p><table border="1"><tbody>{"".join(rows)}</tbody></table></div>'
+        ]
+    return f"<html><head><title>tables</title></head><body>{''.join(tables)}</body></html>"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n_tables", type=int, nargs="+", default=[10, 20, 40, 80])
+    parser.add_argument("--n_rows", type=int, default=50)
+    args = parser.parse_args()
+    logger.remove()
+
+    print(
+        f"{'tables':>7} {'MB':>6} {'bs4 parse(s)':>13} {'bs4 cleanse(s)':>15} {'lxml(s)':>8} {'speedup':>8} {'same':>5}"
+    )
+    for n_tables in args.n_tables:
+        html = make_table_page(n_tables, args.n_rows)
+
+        start = time.perf_counter()
+        soup = BeautifulSoup(html, "lxml")
+        elapsed_parse = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = str(HTMLCleanser().cleanse_html(soup))
+        elapsed_bs4 = time.perf_counter() - start
+
+        # parsing is included, as LXMLCleanser parses the html string by itself
+        start = time.perf_counter()
+        result = LXMLCleanser().cleanse_string(html)
+        elapsed_lxml = time.perf_counter() - start
+
+        speedup = (elapsed_parse + elapsed_bs4) / elapsed_lxml
+        # BeautifulSoup renders void tags as <br/>, lxml as <br>
+        same = expected.replace("/>", ">") == result
+        print(
+            f"{n_tables:>7} {len(html) / 1e6:>6.2f} {elapsed_parse:>13.3f} {elapsed_bs4:>15.3f} "
+            f"{elapsed_lxml:>8.3f} {speedup:>7.1f}x {str(same):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
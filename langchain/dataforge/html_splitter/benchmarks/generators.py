@@ -0,0 +1,76 @@
+"""Synthetic html generators for the benchmarks.
+
+Every generator takes a `scale` (roughly proportional to the size of the html)
+and a `seed`, and returns the same html for the same arguments, so that the
+results are comparable across versions.
+"""
+import random
+from typing import Callable, Dict
+
+WORDS = [
+    "lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do",
+    "eiusmod", "tempor", "incididunt", "ut", "labore", "et", "dolore", "magna", "aliqua", "enim",
+]  # fmt: skip
+
+
+def _sentence(rand: random.Random, n_min: int = 6, n_max: int = 20) -> str:
+    words = [rand.choice(WORDS) for _ in range(rand.randint(n_min, n_max))]
+    return " ".join(words).capitalize() + "."
+
+
+def deep_nesting(scale: int = 1, seed: int = 0, depth: int = 12) -> str:
+    """Blocks of tables nested `depth` times inside the cells, with paragraphs in between."""
+    rand = random.Random(seed)
+    blocks = []
+    for i in range(50 * scale):
+        inner = f"<p>{_sentence(rand)}</p>"
+        for _ in range(depth):
+            cells = "".join(f"<td>{_sentence(rand, 1, 4)}</td>" for _ in range(2))
+            inner = f"<table><tr><td><div>{inner}</div></td>{cells}</tr></table>"
+        blocks += [f"<div><h2>Block {i}</h2>{inner}</div>"]
+    return f"<html><body>{''.join(blocks)}</body></html>"
+
+
+def wide_tables(scale: int = 1, seed: int = 0, n_cols: int = 20, n_rows: int = 50) -> str:
+    """Tables with many columns and a header row, decorated with invalid attributes."""
+    rand = random.Random(seed)
+    tables = []
+    for i in range(4 * scale):
+        head = "<tr>" + "".join(f'<th class="head">Column {j}</th>' for j in range(n_cols)) + "</tr>"
+        rows = []
+        for _ in range(n_rows):
+            cells = "".join(f'<td style="width:2%">{_sentence(rand, 1, 3)}</td>' for _ in range(n_cols))
+            rows += [f"<tr>{cells}</tr>"]
+        tables += [f"<p>Table {i}</p><table><thead>{head}</thead><tbody>{''.join(rows)}</tbody></table>"]
+    return f"<html><body>{''.join(tables)}</body></html>"
+
+
+def long_prose(scale: int = 1, seed: int = 0, n_sentences: int = 200) -> str:
+    """Few very long paragraphs, each exceeding the usual token_max on its own."""
+    rand = random.Random(seed)
+    paragraphs = []
+    for i in range(5 * scale):
+        sentences = " ".join(_sentence(rand) for _ in range(n_sentences))
+        paragraphs += [f"<h2>Section {i}</h2><p>{sentences}</p>"]
+    return f"<html><body>{''.join(paragraphs)}</body></html>"
+
+
+def small_paragraphs(scale: int = 1, seed: int = 0) -> str:
+    """Many short paragraphs and list items, as articles and forums are."""
+    rand = random.Random(seed)
+    elements = []
+    for i in range(1000 * scale):
+        if rand.random() < 0.2:
+            items = "".join(f"<li>{_sentence(rand, 2, 6)}</li>" for _ in range(rand.randint(2, 5)))
+            elements += [f"<ul>{items}</ul>"]
+        else:
+            elements += [f'<p class="text"><span>{_sentence(rand, 3, 12)}</span></p>']
+    return f"<html><body>{''.join(elements)}</body></html>"
+
+
+GENERATORS: Dict[str, Callable[..., str]] = {
+    "deep_nesting": deep_nesting,
+    "wide_tables": wide_tables,
+    "long_prose": long_prose,
+    "small_paragraphs": small_paragraphs,
+}
@@ -0,0 +1,75 @@
+"""Benchmark the parent/child resolution of HTMLSplitter on synthetic nested tables.
+
+Run it inside the html_splitter directory:
+
+    python -m benchmarks.nested_tables --sizes 1000 2000 4000 8000 16000
+"""
+import argparse
+import time
+from typing import List
+
+from bs4 import BeautifulSoup
+
+from splitter.index import NodeIndex
+from splitter.schema import Node
+from splitter.splitter import HTMLSplitter
+from splitter.tokenizer import find_all_nodes
+
+
+def make_nested_tables(n_rows: int, n_cols: int = 4, n_inner_rows: int = 2) -> str:
+    """Make a table of which every row holds a nested table in the first cell."""
+    inner_rows = "".join(f"<tr><td>inner {i}</td><td>value {i}</td></tr>" for i in range(n_inner_rows))
+    rows = []
+    for i in range(n_rows):
+        cells = "".join(f"<td>cell {i}-{j}</td>" for j in range(1, n_cols))
+        rows += [f"<tr><td><table>{inner_rows}</table></td>{cells}</tr>"]
+    return f"<html><body><p>Nested tables</p><table>{''.join(rows)}</table></body></html>"
+
+
+def naive_parents(nodes: List[Node]) -> None:
+    """Reference O(N^2) resolution: scan every node for each node."""
+    for node in nodes:
+        start, end = node.indice
+        parent_cands = [
+            _node for _node in nodes if _node.name != node.name and _node.indice[0] < start and _node.indice[1] > end
+        ]
+        if len(parent_cands) > 0:
+            max(parent_cands, key=lambda x: x.indice[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 2000, 4000])
+    parser.add_argument("--naive_max", type=int, default=5000, help="skip the naive resolution above this node count")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'nodes':>8} {'index(s)':>10} {'us/node':>8} {'naive(s)':>10} {'get_chunks(s)':>14}")
+    for size in args.sizes:
+        soup = BeautifulSoup(make_nested_tables(size), "lxml")
+        splitter = HTMLSplitter(soup=soup, length_func=len, token_max=1500)
+
+        nodes_by_tag = find_all_nodes(splitter.html, splitter.tags)
+        nodes = [node for tag in splitter.tags for node in nodes_by_tag[tag]]
+
+        start = time.perf_counter()
+        NodeIndex(nodes).find_parents()
+        elapsed_index = time.perf_counter() - start
+
+        elapsed_naive = float("nan")
+        if len(nodes) <= args.naive_max:
+            start = time.perf_counter()
+            naive_parents(nodes)
+            elapsed_naive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        splitter.get_chunks()
+        elapsed_chunks = time.perf_counter() - start
+
+        print(
+            f"{size:>8} {len(nodes):>8} {elapsed_index:>10.4f} {elapsed_index / len(nodes) * 1e6:>8.2f} "
+            f"{elapsed_naive:>10.4f} {elapsed_chunks:>14.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark the peak memory of finding nodes as Node objects against the columnar NodeTable.
+
+Run it inside the html_splitter directory:
+
+    python -m benchmarks.node_table --n_tables 1000 5000 20000
+"""
+import argparse
+import time
+import tracemalloc
+
+from splitter.tokenizer import find_all_nodes, find_node_tables
+
+TAGS = ["table", "tr", "td", "th", "p"]
+
+
+def make_page(n_tables: int, n_rows: int, n_cols: int = 6) -> str:
+    """Make a page of plain tables, one tag per line as the cleansed and prettified html is."""
+    lines = []
+    for i in range(n_tables):
+        lines += ["<p>", f"Table {i}", "</p>", "<table>"]
+        for j in range(n_rows):
+            lines += ["<tr>"]
+            for k in range(n_cols):
+                lines += ["<td>", f"cell {j} {k}", "</td>"]
+            lines += ["</tr>"]
+        lines += ["</table>"]
+    return "\n".join(lines)
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_tables", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--n_rows", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'n_tables':>8} {'n_nodes':>8} {'nodes(s)':>9} {'nodes(MB)':>10} {'table(s)':>9} {'table(MB)':>10}")
+    for n_tables in args.n_tables:
+        html = make_page(n_tables=n_tables, n_rows=args.n_rows)
+        nodes, nodes_elapsed, nodes_peak = measure(find_all_nodes, html, TAGS)
+        tables, table_elapsed, table_peak = measure(find_node_tables, html, TAGS)
+        n_nodes = sum(len(table) for table in tables.values())
+        assert n_nodes == sum(len(_nodes) for _nodes in nodes.values())
+        print(
+            f"{n_tables:>8} {n_nodes:>8} {nodes_elapsed:>9.3f} {nodes_peak / 1e6:>10.2f} "
+            f"{table_elapsed:>9.3f} {table_peak / 1e6:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Benchmark HTMLCleanser and HTMLSplitter stage by stage on the synthetic html.
+
+Each stage (parse, cleanse_html, serialize, get_chunks, split_chunks, make_documents)
+is timed separately over `--repeat` runs, and its peak memory is measured with
+tracemalloc in an extra run. The results are written as json, to compare across versions.
+
+Run it inside the html_splitter directory:
+
+    python -m benchmarks.suite --scale 1 2 --output results.json
+    python -m benchmarks.suite --scale 1 2 --output new.json --compare results.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+from loguru import logger
+
+from benchmarks.generators import GENERATORS
+from splitter.cleanser import HTMLCleanser
+from splitter.constant import DEFAULT_VALID_TAGS
+from splitter.splitter import HTMLSplitter
+
+STAGES = ["parse", "cleanse_html", "serialize", "get_chunks", "split_chunks", "make_documents"]
+# the text tags are kept as well, otherwise the prose is left as a trailing string without any node
+VALID_TAGS = DEFAULT_VALID_TAGS + ["p", "h2", "ul", "li"]
+LENGTH_FUNCS: Dict[str, Callable[[str], int]] = {
+    "len": len,
+    "words": lambda text: len(text.split()),
+}
+
+
+def run_stages(
+    html: str, valid_tags: List[str], splitter_kwargs: Dict[str, Any], trace: bool = False
+) -> Dict[str, Any]:
+    """Run the stages once, and measure the elapsed time (or the peak memory if `trace`) of each."""
+    measures: Dict[str, float] = {}
+    outputs: Dict[str, Any] = {}
+
+    def measure(stage: str, func: Callable[[], Any]) -> Any:
+        if trace:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            result = func()
+            _, peak = tracemalloc.get_traced_memory()
+            measures[stage] = (peak - base) / 1e6
+        else:
+            start = time.perf_counter()
+            result = func()
+            measures[stage] = time.perf_counter() - start
+        return result
+
+    soup = measure("parse", lambda: BeautifulSoup(html, "lxml"))
+    cleanser = HTMLCleanser(valid_tags=valid_tags)
+    soup = measure("cleanse_html", lambda: cleanser.cleanse_html(soup))
+    splitter = measure("serialize", lambda: HTMLSplitter(soup=soup, **splitter_kwargs))
+    chunks = measure("get_chunks", splitter.get_chunks)
+    chunks = measure("split_chunks", lambda: splitter.split_chunks(chunks))
+    documents = measure("make_documents", lambda: splitter.make_documents(chunks))
+
+    outputs["n_chunks"] = len(chunks)
+    outputs["n_documents"] = len(documents)
+    outputs["max_length"] = max(document.length for document in documents)
+    return {"measures": measures, **outputs}
+
+
+def run_case(
+    name: str, scale: int, repeat: int, valid_tags: List[str], splitter_kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    html = GENERATORS[name](scale=scale)
+    elapsed: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        run = run_stages(html, valid_tags, splitter_kwargs)
+        for stage in STAGES:
+            elapsed[stage] += [run["measures"][stage]]
+
+    tracemalloc.start()
+    try:
+        peaks = run_stages(html, valid_tags, splitter_kwargs, trace=True)["measures"]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "case": name,
+        "scale": scale,
+        "html_bytes": len(html.encode("utf-8")),
+        "n_chunks": run["n_chunks"],
+        "n_documents": run["n_documents"],
+        "max_length": run["max_length"],
+        "stages": {
+            stage: {
+                "min": min(elapsed[stage]),
+                "median": statistics.median(elapsed[stage]),
+                "peak_mb": peaks[stage],
+            }
+            for stage in STAGES
+        },
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None) -> None:
+    base = {}
+    if baseline is not None:
+        base = {(result["case"], result["scale"]): result for result in baseline["results"]}
+
+    print(f"{'case':>17} {'scale':>5} {'MB':>6} {'stage':>15} {'median(s)':>10} {'peak(MB)':>9} {'vs base':>8}")
+    for result in results:
+        base_result = base.get((result["case"], result["scale"]))
+        for stage, stats in result["stages"].items():
+            ratio = ""
+            if base_result is not None and base_result["stages"][stage]["median"] > 0:
+                ratio = f"{stats['median'] / base_result['stages'][stage]['median']:.2f}x"
+            print(
+                f"{result['case']:>17} {result['scale']:>5} {result['html_bytes'] / 1e6:>6.2f} {stage:>15} "
+                f"{stats['median']:>10.4f} {stats['peak_mb']:>9.2f} {ratio:>8}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", default=list(GENERATORS.keys()), choices=list(GENERATORS.keys()))
+    parser.add_argument("--scale", type=int, nargs="+", default=[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--token_max", type=int, default=1500)
+    parser.add_argument("--valid_tags", nargs="+", default=VALID_TAGS)
+    parser.add_argument("--length_func", default="len", choices=list(LENGTH_FUNCS.keys()))
+    parser.add_argument("--split_strategy", default="trial", choices=["trial", "greedy"])
+    parser.add_argument("--serialization", default="prettify", choices=["prettify", "compact"])
+    parser.add_argument("--output", default=None, help="path of the json file to write the results")
+    parser.add_argument("--compare", default=None, help="path of the json results to compare with")
+    args = parser.parse_args()
+    logger.remove()
+
+    splitter_kwargs = {
+        "length_func": LENGTH_FUNCS[args.length_func],
+        "token_max": args.token_max,
+        "raise_error": False,
+        "split_strategy": args.split_strategy,
+        "serialization": args.serialization,
+    }
+    results = [
+        run_case(name, scale, args.repeat, args.valid_tags, splitter_kwargs)
+        for name in args.cases
+        for scale in sorted(args.scale)
+    ]
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.output is not None:
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+                "token_max": args.token_max,
+                "valid_tags": args.valid_tags,
+                "length_func": args.length_func,
+                "split_strategy": args.split_strategy,
+                "serialization": args.serialization,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from types import CodeType
+from typing import Any, Callable, List, Optional, Set, Union
+
+from splitter.schema import Document
+
+# bump it when the output of the cleanser or splitter changes, to invalidate the cached documents
+CACHE_VERSION = "2"
+# default repr of the objects, e.g. '<Tokenizer object at 0x7f...>'
+_ADDRESS = re.compile(r" at 0x[0-9a-fA-F]+>")
+
+
+@dataclass
+class DocumentCacheInfo:
+    hits: int
+    """Number of html found in the cache."""
+    misses: int
+    """Number of html not found in the cache."""
+    max_bytes: int
+    """Maximum size of the cached documents on disk."""
+    currbytes: int
+    """Size of the cached documents on disk."""
+    n_entries: int
+    """Number of html of which documents are cached."""
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+def _stable_repr(value: Any) -> str:
+    """`repr` of the value, which should describe the value itself rather than its memory address."""
+    text = repr(value)
+    if _ADDRESS.search(text) is not None:
+        raise ValueError(f"The repr of {type(value).__qualname__} object contains the memory address.")
+    return text
+
+
+def _code_digest(code: CodeType, digest: Any) -> None:
+    """Fold the code and its constants into the digest, including the code of its nested functions
+    and comprehensions, of which `repr` has the memory address."""
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            _code_digest(const, digest)
+            continue
+        if isinstance(const, frozenset):
+            # the order of a set depends on the hash seed of the process
+            const = sorted(const, key=repr)
+        digest.update(f"\0{const!r}".encode("utf-8"))
+
+
+def _code_names(code: CodeType) -> List[str]:
+    """Global names the code refers to, including those of its nested functions and comprehensions."""
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names += _code_names(const)
+    return list(dict.fromkeys(names))
+
+
+def _function_digest(func: Callable, seen: Set[Callable]) -> str:
+    if func.__closure__:
+        raise ValueError(f"{func.__qualname__} is a closure.")
+    seen.add(func)
+    code = func.__code__
+    # values the function depends on other than its code: defaults, the referenced globals and the helper functions
+    depends = [_stable_repr(func.__defaults__), _stable_repr(sorted((func.__kwdefaults__ or {}).items()))]
+    for name in _code_names(code):
+        value = func.__globals__.get(name)
+        # e.g., a helper function decorated with functools.lru_cache
+        value = inspect.unwrap(value) if callable(value) else value
+        if inspect.isfunction(value):
+            # each helper once, e.g. for the recursive ones
+            if value not in seen:
+                depends += [f"{name}={value.__module__}.{value.__qualname__}:{_function_digest(value, seen)}"]
+            continue
+        if value is None or inspect.ismodule(value) or inspect.isclass(value) or inspect.isroutine(value):
+            continue
+        depends += [f"{name}={_stable_repr(value)}"]
+    digest = hashlib.blake2b(digest_size=8)
+    _code_digest(code, digest)
+    digest.update("\0".join(depends).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _function_identity(func: Callable) -> str:
+    if func.__name__ == "<lambda>" or func.__closure__ or "<locals>" in func.__qualname__:
+        raise ValueError(f"{func.__qualname__} is a lambda or a closure.")
+    return f"{func.__module__}.{func.__qualname__}:{_function_digest(func, set())}"
+
+
+def _identity(func: Callable) -> str:
+    if isinstance(func, functools.partial):
+        args = _stable_repr(func.args)
+        keywords = _stable_repr(sorted(func.keywords.items()))
+        return f"partial({_identity(func.func)}, {args}, {keywords})"
+    if inspect.ismethod(func):
+        return f"{_identity(func.__func__)} of {_stable_repr(func.__self__)}"
+    if inspect.isfunction(func):
+        return _function_identity(func)
+    if inspect.isbuiltin(func) or inspect.isclass(func):
+        return f"{getattr(func, '__module__', None)}.{func.__qualname__}"
+    return f"{type(func).__module__}.{type(func).__qualname__}({_stable_repr(func)})"
+
+
+def callable_identity(func: Callable) -> str:
+    """Identity of a callable which is stable across the processes and runs.
+
+    A function is identified by its qualified name and the hash of its code, defaults and
+    the globals it refers to, including the code of the global functions it calls (and those
+    they call), so that editing any of them invalidates the cache. The code reached only through
+    a module or an object (e.g., `tokenizer.encode`) is not hashed: give an explicit
+    `length_func_id` which changes with it (e.g., the name and version of the tokenizer). A bound method
+    or a callable object is identified by its class and `repr`, which should describe the object
+    (e.g., HuggingFace tokenizers).
+
+    Raises:
+        ValueError: if the identity is not stable, i.e., for a lambda, a closure, or an object
+        (or the value a function depends on) of which `repr` is the default one with the memory address.
+        Pass an explicit `length_func_id` to the cache in that case.
+    """
+    try:
+        return _identity(func)
+    except ValueError as e:
+        raise ValueError(
+            f"Cannot identify the length function {func!r} across the processes and runs: {e} "
+            "Please give an explicit `length_func_id` (e.g., the name of the tokenizer) to cache the documents."
+        ) from None
+
+
+class DocumentCache(object):
+    """Content-addressed on-disk cache of the documents split from the html.
+
+    The key is the hash of the html together with everything that changes the
+    documents: valid_tags and valid_attrs of the cleanser, token_max, identity
+    of the length function, and the other arguments of the splitter. Each entry
+    is a json file named after its key, so that a cache directory can be shared
+    by the processes (e.g., HTMLPipeline workers) and across runs.
+
+    The least recently used entries are evicted once the total size exceeds
+    `max_bytes`. The sizes are indexed in memory, and re-scanned from the
+    directory before evicting, as other processes may have written to it.
+
+    Example:
+        .. code-block:: python
+
+            from splitter.cache import DocumentCache
+            from splitter.cleanser import HTMLCleanser
+            from splitter.pipeline import split_html
+
+            cache = DocumentCache("YOUR_CACHE_DIRECTORY", max_bytes=1 << 30)
+            documents = split_html("YOUR_HTML", HTMLCleanser(), length_func=len, token_max=1500, cache=cache)
+            print(cache.cache_info().hit_rate)
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int = 1 << 30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits, self.misses = 0, 0
+        # size of each entry, from the least recently used
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self._scan()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _scan(self) -> None:
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries += [(stat.st_mtime, path.stem, stat.st_size)]
+        self._sizes = OrderedDict((key, size) for _, key, size in sorted(entries))
+
+    @property
+    def currbytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def make_key(
+        self,
+        html: str,
+        token_max: int,
+        length_func: Callable[[str], int],
+        valid_tags: Optional[List[str]] = None,
+        valid_attrs: Optional[List[str]] = None,
+        length_func_id: Optional[str] = None,
+        **params: Any,
+    ) -> str:
+        """Make the key of the html and the arguments that change its documents.
+
+        Args:
+            html: raw html to cleanse and split, or the cleansed html to split
+            token_max: maximum token that a document can have
+            length_func: length function to count the number of tokens
+            valid_tags: valid tags of the cleanser, if the html is to be cleansed
+            valid_attrs: valid attributes of the cleanser, if the html is to be cleansed
+            length_func_id: identity of the length function, overriding `callable_identity(length_func)`.
+                Required for a lambda, a closure or an object without a stable `repr`
+            params: other arguments of the cleanser and splitter (e.g., split_strategy)
+
+        Returns:
+            hex digest of the key
+        """
+        config = {
+            "version": CACHE_VERSION,
+            "token_max": token_max,
+            "length_func": length_func_id or callable_identity(length_func),
+            "valid_tags": None if valid_tags is None else sorted(valid_tags),
+            "valid_attrs": None if valid_attrs is None else sorted(valid_attrs),
+            "params": {name: repr(value) for name, value in sorted(params.items())},
+        }
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(html.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Document]]:
+        """Get the cached documents of the key, or None if not cached."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                documents = [Document(**document) for document in json.load(f)]
+            # mark as recently used, for the other processes as well
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            self._sizes.pop(key, None)
+            return None
+
+        self.hits += 1
+        if key not in self._sizes:
+            self._sizes[key] = path.stat().st_size
+        self._sizes.move_to_end(key)
+        return documents
+
+    def put(self, key: str, documents: List[Document]) -> None:
+        """Cache the documents of the key, evicting the least recently used ones over `max_bytes`."""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        data = json.dumps([asdict(document) for document in documents], ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+
+        # write into a temporary file first, so that the other processes never read a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._sizes[key] = len(data)
+        self._sizes.move_to_end(key)
+
+        if self.currbytes > self.max_bytes:
+            self._scan()
+            self._evict()
+
+    def _evict(self) -> None:
+        currbytes = self.currbytes
+        while currbytes > self.max_bytes and len(self._sizes) > 0:
+            key, size = self._sizes.popitem(last=False)
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            currbytes -= size
+
+    def cache_info(self) -> DocumentCacheInfo:
+        return DocumentCacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            max_bytes=self.max_bytes,
+            currbytes=self.currbytes,
+            n_entries=len(self._sizes),
+        )
+
+    def cache_clear(self) -> None:
+        for key in list(self._sizes.keys()):
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+        self._sizes.clear()
+        self.hits, self.misses = 0, 0
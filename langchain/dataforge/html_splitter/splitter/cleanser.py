@@ -1,4 +1,8 @@
+from html import escape
 from typing import List, Tuple
+
+import lxml.etree
+import lxml.html
 from bs4 import BeautifulSoup
 from loguru import logger
 from splitter.constant import DEFAULT_VALID_ATTRS, DEFAULT_VALID_TAGS
@@ -6,6 +10,9 @@ from splitter.logger import set_logger
 
 set_logger(source="cleanser", diagnose=False, to_file=False)
 
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+PRESERVE_WHITESPACE_TAGS = ["pre", "textarea"]
+
 
 class HTMLCleanser(object):
     """Cleanser to cleanse out the invalid tags or attributes
@@ -128,3 +135,161 @@ class HTMLCleanser(object):
                 tag.extract()
 
         return soup
+
+
+class LXMLCleanser(HTMLCleanser):
+    """Cleanser working directly on the lxml tree, instead of the BeautifulSoup object.
+
+    `HTMLCleanser.cleanse_html` walks the whole soup several times: to collect the invalid
+    tags and attributes, to unwrap each invalid tag, to delete the invalid attributes and
+    to remove the empty tags. LXMLCleanser does all of them in a single post-order traversal,
+    where the children of a node are always cleansed before the node itself.
+
+    The output is equivalent to the `HTMLCleanser`, not identical: `cleanse_string` gives the same
+    html as `str` of the soup cleansed by `HTMLCleanser` (except that void tags are rendered as <br>,
+    not <br/>; processing instructions such as <?xml ...?> are dropped rather than kept as comments,
+    as is the whitespace between the closing </html> and a comment after it),
+    but the soup is parsed again from that html. The text left by an unwrapped tag is thus
+    merged with its neighbours into a single string, which `prettify` puts on one line instead of
+    several, so that the indice and lengths of the chunks of `HTMLSplitter` may differ in whitespace.
+
+    Example:
+        .. code-block:: python
+
+            from splitter.cleanser import LXMLCleanser
+
+            cleanser = LXMLCleanser()
+            # cleanse the html string
+            html = cleanser.cleanse_string("YOUR_HTML")
+
+            # or cleanse into the BeautifulSoup object to split
+            soup = cleanser.cleanse_to_soup("YOUR_HTML")
+    """
+
+    @staticmethod
+    def _collapse_whitespace(text: str) -> str:
+        # BeautifulSoup replaces whitespace-only strings with a single space or newline while parsing
+        if text is None or len(text) == 0 or len(text.strip(ASCII_SPACES)) > 0:
+            return text
+        return "\n" if "\n" in text else " "
+
+    def _collect_elements(self, root: lxml.html.HtmlElement) -> List[lxml.html.HtmlElement]:
+        """Collect the elements in pre-order, collapsing the whitespace-only
+        texts outside of <pre> and <textarea> as BeautifulSoup does."""
+        elements, n_preserve = [], 0
+        for event, element in lxml.etree.iterwalk(root, events=("start", "end", "comment", "pi")):
+            if event == "start":
+                elements += [element]
+                n_preserve += 1 if element.tag in PRESERVE_WHITESPACE_TAGS else 0
+                if n_preserve == 0:
+                    element.text = self._collapse_whitespace(element.text)
+            elif event == "end":
+                n_preserve -= 1 if element.tag in PRESERVE_WHITESPACE_TAGS else 0
+                if n_preserve == 0:
+                    element.tail = self._collapse_whitespace(element.tail)
+            elif n_preserve == 0:
+                # comments and processing instructions have the tail only
+                element.tail = self._collapse_whitespace(element.tail)
+        return elements
+
+    def cleanse_tree(self, root: lxml.html.HtmlElement) -> lxml.html.HtmlElement:
+        """Cleanse out the invalid_tags and invalid_attrs inside the lxml tree in place.
+        The root itself is never unwrapped, see `cleanse_string` to drop an invalid root.
+
+        Args:
+            root: root element of the lxml tree
+
+        Returns:
+            cleansed root element
+        """
+        valid_tags, valid_attrs = set(self.valid_tags), set(self.valid_attrs)
+        # keep the references of elements to look up the text flags by element
+        elements = self._collect_elements(root)
+        has_text = {}
+
+        # reversed pre-order visits the children before their parent
+        for element in reversed(elements):
+            # whether any text (except whitespaces) is inside the element
+            text = element.text is not None and len(element.text.strip()) > 0
+            for child in element:
+                text = text or has_text.get(child, False)
+                text = text or (child.tail is not None and len(child.tail.strip()) > 0)
+            has_text[element] = text
+
+            if element.tag not in valid_tags and element is not root:
+                # unwrap: the text and children are moved into the parent
+                element.drop_tag()
+            elif element.tag != "img" and not text and element is not root:
+                # img tag generally has no content in it.
+                element.drop_tree()
+            else:
+                for attr in list(element.attrib.keys()):
+                    if attr not in valid_attrs:
+                        del element.attrib[attr]
+        return root
+
+    def _cleanse_markup(self, html: str) -> Tuple[str, str]:
+        """Cleanse the html string into its doctype (empty if none) and the cleansed contents."""
+        if len(html.strip(ASCII_SPACES)) == 0:
+            # lxml refuses the empty document, which HTMLCleanser cleanses into ''
+            return "", ""
+        try:
+            root = lxml.html.document_fromstring(html)
+        except lxml.etree.ParserError:
+            # the document has no element (e.g., comments only); parse it with an empty root to drop later
+            root = lxml.html.document_fromstring(html + "<html></html>")
+        root = self.cleanse_tree(root)
+        # lxml gives the default doctype even if the html has no doctype
+        has_doctype = html.lstrip()[:9].lower() == "<!doctype"
+        doctype = root.getroottree().docinfo.doctype if has_doctype else ""
+
+        # comments before and after the root are its siblings, not children
+        contents = [lxml.html.tostring(sibling, encoding="unicode") for sibling in root.itersiblings(preceding=True)]
+        contents.reverse()
+        if root.tag in self.valid_tags:
+            contents += [lxml.html.tostring(root, encoding="unicode", with_tail=False)]
+        else:
+            # unwrap the root as well, leaving its text and children only
+            contents += [escape(root.text, quote=False)] if root.text is not None else []
+            contents += [lxml.html.tostring(child, encoding="unicode") for child in root]
+        contents += [lxml.html.tostring(sibling, encoding="unicode") for sibling in root.itersiblings()]
+        return doctype, "".join(contents)
+
+    def cleanse_string(self, html: str) -> str:
+        """Cleanse out the invalid_tags and invalid_attrs inside the html string.
+
+        Args:
+            html: html string
+
+        Returns:
+            cleansed html string
+        """
+        doctype, contents = self._cleanse_markup(html)
+        # BeautifulSoup puts a newline after the doctype
+        return doctype + "\n" + contents if doctype else contents
+
+    def cleanse_to_soup(self, html: str) -> BeautifulSoup:
+        """Cleanse the html string into the BeautifulSoup object, of which `str` is `cleanse_string(html)`.
+
+        Args:
+            html: html string
+
+        Returns:
+            cleansed soup object
+        """
+        doctype, contents = self._cleanse_markup(html)
+        # `html.parser` does not wrap the cleansed html with <html> and <body> again,
+        # and BeautifulSoup adds the newline after the doctype by itself
+        return BeautifulSoup(doctype + contents, "html.parser")
+
+    def cleanse_html(self, soup: BeautifulSoup) -> BeautifulSoup:
+        """Cleanse out the invalid_tags and invalid_attrs inside the BeautifulSoup object.
+        It serializes the soup and cleanses the html on the lxml tree.
+
+        Args:
+            soup: BeautifulSoup object
+
+        Returns:
+            cleansed soup object
+        """
+        return self.cleanse_to_soup(str(soup))
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Literal, Optional, Set, Tuple, Union
+
+from splitter.schema import Chunk
+
+# modulus of the universal hash functions of MinHash, a mersenne prime
+_MERSENNE_PRIME = (1 << 61) - 1
+_SIMHASH_BITS = 64
+
+
+@dataclass
+class DedupStats:
+    n_chunks: int = 0
+    """Number of chunks checked."""
+    n_exact: int = 0
+    """Number of chunks skipped as exact duplicates."""
+    n_near: int = 0
+    """Number of chunks skipped as near duplicates."""
+    tokens_total: int = 0
+    """Number of tokens of the chunks checked."""
+    tokens_saved: int = 0
+    """Number of tokens of the chunks skipped."""
+
+    @property
+    def saved_ratio(self) -> float:
+        return self.tokens_saved / self.tokens_total if self.tokens_total > 0 else 0.0
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class ChunkDeduplicator(object):
+    """Skip the chunks that were already seen, exactly or nearly, across the pages.
+
+    Crawled sites repeat the same boilerplate (e.g., navigation tables, footers)
+    on every page. Each chunk is normalized by collapsing the whitespaces, as the
+    prettified indentation depends on where the chunk is, and then checked:
+
+    - exactly, by the hash of the normalized content.
+    - nearly, by the MinHash signature of its word shingles with LSH banding
+    (estimated jaccard similarity >= `threshold`), or by its 64-bit SimHash
+    (hamming distance <= `max_distance`), according to `method`.
+
+    Chunks shorter than `min_length` tokens (e.g., the whitespace between the nodes)
+    are always kept. The index is kept in memory, and saved into `index_path` by
+    `save`, so that the duplicates are skipped across the runs as well.
+
+    Example:
+        .. code-block:: python
+
+            deduplicator = ChunkDeduplicator(index_path="dedup_index.json")
+            for soup in soups:
+                splitter = HTMLSplitter(soup=soup, length_func=len, token_max=1500, deduplicator=deduplicator)
+                documents = list(splitter.iter_documents())
+            deduplicator.save()
+            print(deduplicator.stats.tokens_saved)
+    """
+
+    def __init__(
+        self,
+        method: Literal["minhash", "simhash"] = "minhash",
+        threshold: float = 0.9,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        max_distance: int = 3,
+        min_length: int = 20,
+        index_path: Optional[Union[str, Path]] = None,
+        seed: int = 1,
+    ):
+        if method == "minhash" and num_perm % bands != 0:
+            raise ValueError(f"num_perm should be divisible by bands, but got {num_perm} and {bands}.")
+        if method == "simhash" and max_distance >= 4:
+            # the signature is split into max_distance + 1 blocks, of which at least one is equal
+            raise ValueError(
+                f"max_distance should be less than 4 to keep the blocks 16 bits at least, got {max_distance}."
+            )
+        self.method = method
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.index_path = None if index_path is None else Path(index_path)
+        self.seed = seed
+        self.stats = DedupStats()
+
+        rand = random.Random(seed)
+        self._perms = [
+            (rand.randrange(1, _MERSENNE_PRIME), rand.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+        self._exact: Set[str] = set()
+        self._signatures: List[Union[List[int], int]] = []
+        # band (or block) of a signature -> positions of the signatures in `_signatures`
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+
+        if self.index_path is not None and self.index_path.exists():
+            self.load(self.index_path)
+
+    @staticmethod
+    def _normalize(content: str) -> str:
+        return re.sub(r"\s+", " ", content).strip()
+
+    def _shingles(self, text: str) -> Set[int]:
+        words = re.findall(r"\w+", text.lower())
+        if len(words) <= self.shingle_size:
+            return {_hash64(" ".join(words))}
+        return {_hash64(" ".join(words[i : i + self.shingle_size])) for i in range(len(words) - self.shingle_size + 1)}
+
+    def _minhash(self, shingles: Set[int]) -> List[int]:
+        return [min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles) for a, b in self._perms]
+
+    @staticmethod
+    def _simhash(shingles: Set[int]) -> int:
+        weights = [0] * _SIMHASH_BITS
+        for shingle in shingles:
+            for bit in range(_SIMHASH_BITS):
+                weights[bit] += 1 if shingle >> bit & 1 else -1
+        return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+    def _signature(self, text: str) -> Union[List[int], int]:
+        shingles = self._shingles(text)
+        return self._minhash(shingles) if self.method == "minhash" else self._simhash(shingles)
+
+    def _bucket_keys(self, signature: Union[List[int], int]) -> List[Tuple[int, Tuple[int, ...]]]:
+        if self.method == "minhash":
+            rows = self.num_perm // self.bands
+            return [(band, tuple(signature[band * rows : (band + 1) * rows])) for band in range(self.bands)]
+        n_blocks = self.max_distance + 1
+        block_bits = _SIMHASH_BITS // n_blocks
+        mask = (1 << block_bits) - 1
+        return [(block, (signature >> (block * block_bits) & mask,)) for block in range(n_blocks)]
+
+    def _is_similar(self, signature: Union[List[int], int], other: Union[List[int], int]) -> bool:
+        if self.method == "minhash":
+            n_equal = sum(1 for value, _value in zip(signature, other) if value == _value)
+            return n_equal / self.num_perm >= self.threshold
+        return bin(signature ^ other).count("1") <= self.max_distance
+
+    def _find_near(self, signature: Union[List[int], int]) -> bool:
+        for key in self._bucket_keys(signature):
+            for position in self._buckets.get(key, []):
+                if self._is_similar(signature, self._signatures[position]):
+                    return True
+        return False
+
+    def _add_signature(self, signature: Union[List[int], int]) -> None:
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for key in self._bucket_keys(signature):
+            self._buckets[key].append(position)
+
+    def check(self, content: str) -> Optional[Literal["exact", "near"]]:
+        """Check if the content is a duplicate, and add it to the index if not.
+
+        Returns:
+            'exact' or 'near' if it is a duplicate, otherwise None
+        """
+        text = self._normalize(content)
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        if digest in self._exact:
+            return "exact"
+
+        # the exact copies of a near duplicate are found by the digest afterwards
+        self._exact.add(digest)
+        signature = self._signature(text)
+        if self._find_near(signature):
+            return "near"
+        self._add_signature(signature)
+        return None
+
+    def iter_unique(self, chunks: Iterable[Chunk], length_func: Callable[[str], int]) -> Iterator[Chunk]:
+        """Iterate over the chunks, skipping the duplicates of the chunks seen before.
+
+        Args:
+            chunks: chunks to deduplicate
+            length_func: length function to count the tokens of each chunk (e.g., the cached one of HTMLSplitter)
+
+        Returns:
+            Iterator of the unique chunks
+        """
+        for chunk in chunks:
+            length = length_func(chunk.content)
+            self.stats.n_chunks += 1
+            self.stats.tokens_total += length
+            if length < self.min_length:
+                yield chunk
+                continue
+
+            duplicate = self.check(chunk.content)
+            if duplicate is None:
+                yield chunk
+                continue
+            if duplicate == "exact":
+                self.stats.n_exact += 1
+            else:
+                self.stats.n_near += 1
+            self.stats.tokens_saved += length
+
+    def _config(self) -> dict:
+        return {
+            "method": self.method,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "shingle_size": self.shingle_size,
+            "max_distance": self.max_distance,
+            "seed": self.seed,
+        }
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> None:
+        """Save the index into the path (defaults to `index_path`)."""
+        path = path or self.index_path
+        if path is None:
+            raise ValueError("path should be given to save the index, as index_path is not set.")
+        path = Path(path)
+        index = {
+            "config": self._config(),
+            "exact": sorted(self._exact),
+            "signatures": self._signatures,
+        }
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        tmp_path.replace(path)
+
+    def load(self, path: Union[str, Path]) -> None:
+        """Load the index saved by `save`, which should be made with the same configuration."""
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index["config"] != self._config():
+            raise ValueError(f"Configuration of the index {index['config']} differs from {self._config()}.")
+        self._exact = set(index["exact"])
+        self._signatures, self._buckets = [], defaultdict(list)
+        for signature in index["signatures"]:
+            self._add_signature(signature)
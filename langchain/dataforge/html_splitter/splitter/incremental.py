@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import hashlib
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from splitter.schema import Chunk, Document
+
+
+@dataclass
+class SplitResult:
+    chunks: List[Chunk]
+    """Top-level chunks of the html, as `get_chunks` returns."""
+    pieces: List[List[Chunk]]
+    """Split chunks of each top-level chunk, as `split_chunks` returns for it."""
+    lengths: List[List[int]]
+    """Length of each split chunk."""
+    boundaries: List[int]
+    """Start of each document, as the position in the flattened split chunks."""
+    documents: List[Document]
+    """Documents, of which metadata has a stable `id` made from the page content."""
+
+    def flat_pieces(self) -> List[Chunk]:
+        return [piece for pieces in self.pieces for piece in pieces]
+
+    def flat_lengths(self) -> List[int]:
+        return [length for lengths in self.lengths for length in lengths]
+
+
+@dataclass
+class IncrementalUpdate:
+    result: SplitResult
+    """Split result of the new html, to pass to the next `resplit`."""
+    added: List[Document] = field(default_factory=list)
+    """Documents which are new or changed, to upsert into the downstream index."""
+    removed_ids: List[str] = field(default_factory=list)
+    """Ids of the previous documents which no longer exist, to delete from the downstream index."""
+    n_resplit: int = 0
+    """Number of top-level chunks split again."""
+    n_reused: int = 0
+    """Number of top-level chunks of which split chunks are reused."""
+
+
+def document_id(page_content: str) -> str:
+    """Stable id of a document, which stays the same as long as its content does."""
+    return hashlib.blake2b(page_content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def common_affixes(old: List[Chunk], new: List[Chunk]) -> Tuple[int, int]:
+    """Number of the top-level chunks of the same content at the head and tail of both lists.
+    They never overlap each other, so that the chunks in-between are the edited ones."""
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix].content == new[prefix].content:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix].content == new[-1 - suffix].content:
+        suffix += 1
+    return prefix, suffix
+
+
+def shift_chunk(chunk: Chunk, offset: int) -> Chunk:
+    """Move the chunk by offset, as the html before it is edited.
+    The (0, 0) indice, which the trial split gives to the split sentences, is not a position and stays as it is."""
+    if chunk.indice is None or chunk.indice == (0, 0):
+        indice = chunk.indice
+    else:
+        indice = (chunk.indice[0] + offset, chunk.indice[1] + offset)
+    return Chunk(indice=indice, content=chunk.content, metadata=dict(chunk.metadata))
+
+
+def iter_page_ranges(lengths: List[int], token_max: int, start: int = 0) -> Iterator[Tuple[int, int]]:
+    """Pack the chunks from `start` into the (start, end) ranges of the documents, the same as `make_documents`.
+
+    A document is made once the next chunk overflows the token_max. As `make_documents`
+    does, the first chunk overflowing on its own makes an empty document before it.
+    """
+    page_start, cum_length = start, 0
+    for i in range(start, len(lengths)):
+        cum_length += lengths[i]
+        if cum_length > token_max and (i > page_start or i == 0):
+            yield page_start, i
+            page_start, cum_length = i, lengths[i]
+    yield page_start, len(lengths)
+
+
+def make_document(page: int, pieces: List[Chunk], lengths: List[int], start: int, end: int) -> Document:
+    page_content = "".join([piece.content for piece in pieces[start:end]])
+    return Document(
+        page=page, page_content=page_content, length=sum(lengths[start:end]), metadata={"id": document_id(page_content)}
+    )
+
+
+def find_boundary(boundaries: List[int], boundary: int) -> Optional[int]:
+    """Index of the document starting at the boundary, if any.
+    When the first chunk overflows on its own, the empty first document starts at the same
+    boundary as the next one, so that the last document starting there is taken."""
+    i = bisect_right(boundaries, boundary) - 1
+    return i if i >= 0 and boundaries[i] == boundary else None
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Hashable, List, Optional, Sequence, Tuple, Union
+
+from splitter.schema import Node, NodeTable
+
+# (start_idx, -position in the node list, position in the node list)
+_Entry = Tuple[int, int, int]
+
+
+class NodeIndex(object):
+    """Interval index to resolve the nearest parent of each node in O(N log N).
+
+    A parent of a node is the node with a different tag name which strictly
+    encloses it (`_start < start and _end > end`), and the nearest parent is
+    the enclosing one with the largest start index. If several candidates
+    share the same start index, the one that comes first in the node list wins.
+
+    Nodes are swept in the order of their start index and inserted into a
+    fenwick tree keyed by their end index, so that the enclosing nodes of a
+    node are found by a single prefix query over the ends larger than its end.
+    Each cell of the tree keeps the best entries of two different tag names,
+    as the best entry may have the same tag name as the node being resolved.
+
+    Example:
+        .. code-block:: python
+
+            index = NodeIndex(nodes)
+            parents = index.find_parents()
+
+            # or over a columnar NodeTable, without creating Node objects
+            positions = NodeIndex(table).find_parent_positions()
+    """
+
+    def __init__(self, nodes: Union[List[Node], NodeTable]):
+        self.nodes = nodes
+        # columns of the start, end index and name of the nodes.
+        # a NodeTable is read directly without creating Node objects
+        if isinstance(nodes, NodeTable):
+            self._starts: Sequence[int] = nodes.starts
+            self._node_ends: Sequence[int] = nodes.ends
+            self._names: Sequence[Hashable] = nodes.name_ids
+        else:
+            self._starts = [node.indice[0] for node in nodes]
+            self._node_ends = [node.indice[1] for node in nodes]
+            self._names = [node.name for node in nodes]
+        # end indices in ascending order, to rank the end index of nodes
+        self._ends = sorted(set(self._node_ends))
+        self._tree: List[List[_Entry]] = [[] for _ in range(len(self._ends) + 1)]
+
+    def _merge(self, entries: List[_Entry]) -> List[_Entry]:
+        """Keep the best entry and the best one among those with a different tag name."""
+        entries = sorted(set(entries), reverse=True)
+        best = entries[:1]
+        for entry in entries[1:]:
+            if self._names[entry[2]] != self._names[best[0][2]]:
+                best.append(entry)
+                break
+        return best
+
+    def _rank(self, end: int) -> int:
+        """1-based rank of the end index in descending order."""
+        return len(self._ends) - bisect_left(self._ends, end)
+
+    def _insert(self, position: int) -> None:
+        entry = (self._starts[position], -position, position)
+        i = self._rank(self._node_ends[position])
+        while i < len(self._tree):
+            self._tree[i] = self._merge(self._tree[i] + [entry])
+            i += i & (-i)
+
+    def _query(self, position: int) -> int:
+        # number of distinct end indices larger than the end of node
+        i = len(self._ends) - bisect_right(self._ends, self._node_ends[position])
+        entries = []
+        while i > 0:
+            entries += self._tree[i]
+            i -= i & (-i)
+        for _, _, cand in sorted(entries, reverse=True):
+            if self._names[cand] != self._names[position]:
+                return cand
+        return -1
+
+    def find_parent_positions(self) -> array:
+        """Find the position of the nearest parent of each node.
+
+        Returns:
+            Array of the position of the parent node (or -1 if it has no parent), in the same order as the nodes.
+        """
+        parents = array("q", [-1]) * len(self._starts)
+        order = sorted(range(len(self._starts)), key=self._starts.__getitem__)
+
+        i = 0
+        while i < len(order):
+            # nodes starting at the same index cannot be parents of each other
+            j = i
+            start = self._starts[order[i]]
+            while j < len(order) and self._starts[order[j]] == start:
+                j += 1
+            for position in order[i:j]:
+                parents[position] = self._query(position)
+            for position in order[i:j]:
+                self._insert(position)
+            i = j
+        return parents
+
+    def find_parents(self) -> List[Optional[Node]]:
+        """Find the nearest parent of each node.
+
+        Returns:
+            List of the parent node (or None if it has no parent), in the same order as the nodes.
+        """
+        return [None if parent == -1 else self.nodes[parent] for parent in self.find_parent_positions()]
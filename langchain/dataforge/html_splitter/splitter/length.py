@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class CacheInfo:
+    hits: int
+    """Number of lengths found in the cache."""
+    misses: int
+    """Number of lengths counted through the length function."""
+    maxsize: int
+    """Maximum number of lengths to keep."""
+    currsize: int
+    """Number of lengths currently kept."""
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+class LengthCache(object):
+    """LRU cache of the length of texts, keyed by the hash of the content.
+
+    Counting the number of tokens is usually the most expensive part of splitting
+    (e.g., HuggingFace tokenizer as length_func), and the same chunk is measured
+    several times across `split_chunks` and `make_documents`. The cache counts
+    the length of each distinct content only once, while the least recently used
+    lengths are evicted over `maxsize`.
+
+    If `batch_length_func` is given, lengths of the texts missing in the cache are
+    counted together in batches of `batch_size` (e.g., fast tokenizers which
+    tokenize many texts in one call), instead of calling `length_func` one by one.
+
+    Example:
+        .. code-block:: python
+
+            from transformers import AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained("YOUR_TOKENIZER")
+            cache = LengthCache(
+                length_func=lambda text: len(tokenizer.tokenize(text)),
+                batch_length_func=lambda texts: [len(ids) for ids in tokenizer(texts)["input_ids"]],
+            )
+            lengths = cache.get_many(["text 1", "text 2"])
+            print(cache.cache_info().hit_rate)
+    """
+
+    def __init__(
+        self,
+        length_func: Callable[[str], int],
+        batch_length_func: Optional[Callable[[List[str]], List[int]]] = None,
+        maxsize: int = 10000,
+        batch_size: int = 256,
+    ):
+        self.length_func = length_func
+        self.batch_length_func = batch_length_func
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self._lengths: OrderedDict[bytes, int] = OrderedDict()
+        self.hits, self.misses = 0, 0
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _lookup(self, key: bytes) -> Optional[int]:
+        length = self._lengths.get(key)
+        if length is not None:
+            self._lengths.move_to_end(key)
+        return length
+
+    def _store(self, key: bytes, length: int) -> None:
+        if self.maxsize <= 0:
+            return
+        self._lengths[key] = length
+        self._lengths.move_to_end(key)
+        while len(self._lengths) > self.maxsize:
+            self._lengths.popitem(last=False)
+
+    def __call__(self, text: str) -> int:
+        key = self._key(text)
+        length = self._lookup(key)
+        if length is not None:
+            self.hits += 1
+            return length
+
+        self.misses += 1
+        length = self.length_func(text)
+        self._store(key, length)
+        return length
+
+    def _fill(self, texts: List[str]) -> Tuple[List[bytes], Dict[bytes, int], int]:
+        """Look up the texts and count the missing ones in batches,
+        returning the keys, their lengths and the number of the missing ones."""
+        keys = [self._key(text) for text in texts]
+        lengths: Dict[bytes, int] = {}
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key in lengths or key in missing:
+                continue
+            length = self._lookup(key)
+            if length is None:
+                missing[key] = text
+            else:
+                lengths[key] = length
+
+        missing_keys = list(missing.keys())
+        for i in range(0, len(missing_keys), self.batch_size):
+            batch_keys = missing_keys[i : i + self.batch_size]
+            batch_lengths = self.batch_length_func([missing[key] for key in batch_keys])
+            for key, length in zip(batch_keys, batch_lengths):
+                lengths[key] = length
+                self._store(key, length)
+        return keys, lengths, len(missing_keys)
+
+    def get_many(self, texts: List[str]) -> List[int]:
+        """Get the lengths of the texts, counting the missing ones in batches if possible."""
+        if self.batch_length_func is None:
+            return [self(text) for text in texts]
+
+        keys, lengths, n_missing = self._fill(texts)
+        self.misses += n_missing
+        self.hits += len(keys) - n_missing
+        return [lengths[key] for key in keys]
+
+    def prefetch(self, texts: List[str]) -> None:
+        """Count the lengths of the texts missing in the cache in batches, ahead of their lookups.
+        It leaves the hits and misses to the lookups, and does nothing if the lengths are not kept."""
+        if self.batch_length_func is None or self.maxsize <= 0:
+            return
+        self._fill(texts)
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(hits=self.hits, misses=self.misses, maxsize=self.maxsize, currsize=len(self._lengths))
+
+    def cache_clear(self) -> None:
+        self._lengths.clear()
+        self.hits, self.misses = 0, 0
+
+
+def pack_lengths(lengths: List[int], budget: int) -> List[Tuple[int, int]]:
+    """Pack the consecutive units greedily into the largest groups under the budget.
+
+    The end of each group is found by a binary search over the prefix sums of
+    the lengths, so that each unit is measured only once. A unit longer than
+    the budget makes a group on its own.
+
+    Args:
+        lengths: lengths of the units (e.g., rows of a table, sentences)
+        budget: maximum sum of the lengths that a group can have
+
+    Returns:
+        List of (start, end) ranges of the units in each group. end is exclusive.
+    """
+    prefix = list(accumulate(lengths, initial=0))
+    groups, start = [], 0
+    while start < len(lengths):
+        end = bisect_right(prefix, prefix[start] + budget, lo=start + 1) - 1
+        end = max(end, start + 1)
+        groups += [(start, end)]
+        start = end
+    return groups
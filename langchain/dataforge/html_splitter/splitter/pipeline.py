@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Literal, Optional, Set, Tuple, Union
+
+from bs4 import BeautifulSoup
+from loguru import logger
+
+from splitter.cache import DocumentCache, callable_identity
+from splitter.cleanser import HTMLCleanser, LXMLCleanser
+from splitter.schema import Document
+from splitter.splitter import HTMLSplitter
+
+HTML_SUFFIXES = [".html", ".htm"]
+
+
+@dataclass
+class PipelineStats:
+    n_files: int = 0
+    """Number of html files processed."""
+    n_failed: int = 0
+    """Number of html files failed to process."""
+    n_documents: int = 0
+    """Number of documents written to the sink."""
+    n_bytes: int = 0
+    """Size of the html files processed."""
+    n_cache_hits: int = 0
+    """Number of html files of which documents are read from the cache."""
+    n_cache_misses: int = 0
+    """Number of html files not found in the cache."""
+    elapsed: float = 0.0
+    """Wall time of the whole pipeline."""
+    stage_elapsed: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    """Time spent on each stage, summed over the files (read, parse, cleanse, split, write)."""
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.n_documents / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.n_bytes / 1e6 / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        stages = ", ".join(f"{stage}: {elapsed:.2f}s" for stage, elapsed in self.stage_elapsed.items())
+        return (
+            f"files: {self.n_files} (failed: {self.n_failed}), documents: {self.n_documents}, "
+            f"cache hits: {self.n_cache_hits}, misses: {self.n_cache_misses}, "
+            f"elapsed: {self.elapsed:.2f}s, {self.docs_per_sec:.1f} docs/s, {self.mb_per_sec:.2f} MB/s\n"
+            f"stages: {stages}"
+        )
+
+
+class JSONLSink(object):
+    """Write each document as a json line."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = None
+
+    def __enter__(self) -> JSONLSink:
+        self._file = open(self.path, "w", encoding="utf-8")
+        return self
+
+    def write(self, documents: List[Dict[str, Any]]) -> None:
+        for document in documents:
+            self._file.write(json.dumps(document, ensure_ascii=False) + "\n")
+
+    def __exit__(self, *exc) -> None:
+        self._file.close()
+
+
+class ParquetSink(object):
+    """Write the documents into a parquet file, every `batch_size` documents as a row group.
+    It requires `pyarrow` to be installed."""
+
+    def __init__(self, path: Union[str, Path], batch_size: int = 10000):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._buffer: List[Dict[str, Any]] = []
+        self._writer = None
+
+    def __enter__(self) -> ParquetSink:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Could not import pyarrow. Please install it with `pip install pyarrow`.")
+        return self
+
+    def _flush(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if len(self._buffer) == 0:
+            return
+        # metadata is kept as a json string, as its keys may differ between documents
+        rows = [{**document, "metadata": json.dumps(document["metadata"])} for document in self._buffer]
+        table = pa.Table.from_pylist(rows)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+        self._buffer = []
+
+    def write(self, documents: List[Dict[str, Any]]) -> None:
+        self._buffer += documents
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def __exit__(self, *exc) -> None:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def iter_html_files(source: Union[str, Path, Iterable[Union[str, Path]]]) -> Iterator[Path]:
+    """Iterate over the html files in the directory (recursively), or the given paths."""
+    if isinstance(source, (str, Path)) and Path(source).is_dir():
+        for path in sorted(Path(source).rglob("*")):
+            if path.suffix.lower() in HTML_SUFFIXES and path.is_file():
+                yield path
+    elif isinstance(source, (str, Path)):
+        yield Path(source)
+    else:
+        for path in source:
+            yield Path(path)
+
+
+@dataclass
+class _Result:
+    path: str
+    n_bytes: int
+    documents: List[Dict[str, Any]]
+    stage_elapsed: Dict[str, float]
+    cache_hit: Optional[bool] = None
+    error: Optional[str] = None
+
+
+# cleanser and splitter arguments of the worker process, set by `_init_worker`
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(pipeline: HTMLPipeline) -> None:
+    # do not flood the log with the cleanser initialization of each worker
+    logger.disable("splitter.cleanser")
+    cleanser_class = LXMLCleanser if pipeline.cleanser == "lxml" else HTMLCleanser
+    _worker["cleanser"] = cleanser_class(valid_tags=pipeline.valid_tags, valid_attrs=pipeline.valid_attrs)
+    _worker["pipeline"] = pipeline
+    # every worker shares the same cache directory
+    _worker["cache"] = (
+        None if pipeline.cache_dir is None else DocumentCache(pipeline.cache_dir, max_bytes=pipeline.cache_max_bytes)
+    )
+
+
+def _make_cache_key(
+    cache: DocumentCache,
+    html: str,
+    cleanser: HTMLCleanser,
+    length_func: Callable[[str], int],
+    token_max: int,
+    features: str,
+    splitter_kwargs: Dict[str, Any],
+    length_func_id: Optional[str] = None,
+) -> str:
+    return cache.make_key(
+        html,
+        token_max=token_max,
+        length_func=length_func,
+        length_func_id=length_func_id,
+        valid_tags=cleanser.valid_tags,
+        valid_attrs=cleanser.valid_attrs,
+        cleanser=type(cleanser).__name__,
+        features=features,
+        **splitter_kwargs,
+    )
+
+
+def _split_html(
+    html: str,
+    cleanser: HTMLCleanser,
+    length_func: Callable[[str], int],
+    token_max: int,
+    cache: Optional[DocumentCache],
+    features: str,
+    length_func_id: Optional[str],
+    splitter_kwargs: Dict[str, Any],
+    stage_elapsed: Dict[str, float],
+) -> Tuple[List[Document], bool]:
+    """Body of `split_html`, adding the time of each stage (cache, parse, cleanse, split) into `stage_elapsed`.
+
+    Returns:
+        Documents, and whether they are read from the cache
+    """
+    key = None
+    if cache is not None:
+        start = time.perf_counter()
+        key = _make_cache_key(cache, html, cleanser, length_func, token_max, features, splitter_kwargs, length_func_id)
+        documents = cache.get(key)
+        stage_elapsed["cache"] += time.perf_counter() - start
+        if documents is not None:
+            return documents, True
+
+    start = time.perf_counter()
+    if isinstance(cleanser, LXMLCleanser):
+        # LXMLCleanser parses the html string by itself, within the cleanse stage
+        soup = cleanser.cleanse_to_soup(html)
+    else:
+        soup = BeautifulSoup(html, features)
+        stage_elapsed["parse"] += time.perf_counter() - start
+        start = time.perf_counter()
+        soup = cleanser.cleanse_html(soup)
+    stage_elapsed["cleanse"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    splitter = HTMLSplitter(soup=soup, length_func=length_func, token_max=token_max, **splitter_kwargs)
+    documents = list(splitter.iter_documents())
+    stage_elapsed["split"] += time.perf_counter() - start
+
+    if cache is not None:
+        start = time.perf_counter()
+        cache.put(key, documents)
+        stage_elapsed["cache"] += time.perf_counter() - start
+    return documents, False
+
+
+def split_html(
+    html: str,
+    cleanser: HTMLCleanser,
+    length_func: Callable[[str], int],
+    token_max: int,
+    cache: Optional[DocumentCache] = None,
+    features: str = "lxml",
+    length_func_id: Optional[str] = None,
+    **splitter_kwargs: Any,
+) -> List[Document]:
+    """Cleanse and split a raw html into the documents, checking the cache first.
+    On a cache hit, the html is neither parsed, cleansed nor split.
+
+    Args:
+        html: raw html string
+        cleanser: HTMLCleanser or LXMLCleanser
+        length_func: length function to count the number of tokens
+        token_max: maximum token that a document can have
+        cache: on-disk cache of the documents. If None, always cleanse and split
+        features: parser of BeautifulSoup for HTMLCleanser
+        length_func_id: identity of the length function in the cache key, see `DocumentCache.make_key`
+        splitter_kwargs: other arguments of HTMLSplitter
+
+    Returns:
+        List of Documents
+    """
+    documents, _ = _split_html(
+        html, cleanser, length_func, token_max, cache, features, length_func_id, splitter_kwargs, defaultdict(float)
+    )
+    return documents
+
+
+def _process_file(path: Path) -> _Result:
+    pipeline: HTMLPipeline = _worker["pipeline"]
+    cleanser: HTMLCleanser = _worker["cleanser"]
+    cache: Optional[DocumentCache] = _worker["cache"]
+    stage_elapsed = defaultdict(float)
+    try:
+        start = time.perf_counter()
+        raw = path.read_bytes()
+        html = raw.decode(pipeline.encoding, errors="replace")
+        stage_elapsed["read"] = time.perf_counter() - start
+
+        # the documents are cached before adding the source, as the same html may come from other paths
+        split_documents, cache_hit = _split_html(
+            html,
+            cleanser,
+            pipeline.length_func,
+            pipeline.token_max,
+            cache,
+            "lxml",
+            pipeline.length_func_id,
+            pipeline.splitter_kwargs,
+            stage_elapsed,
+        )
+        documents = [
+            {**asdict(document), "metadata": {**document.metadata, "source": str(path)}} for document in split_documents
+        ]
+        return _Result(
+            path=str(path),
+            n_bytes=len(raw),
+            documents=documents,
+            stage_elapsed=dict(stage_elapsed),
+            cache_hit=None if cache is None else cache_hit,
+        )
+    except Exception as e:
+        return _Result(path=str(path), n_bytes=0, documents=[], stage_elapsed=dict(stage_elapsed), error=repr(e))
+
+
+@dataclass
+class HTMLPipeline(object):
+    length_func: Callable[[str], int]
+    """Length function to count the number of tokens. It should be picklable (e.g., no lambda)."""
+    token_max: int
+    """Maximum token that a document can have."""
+    valid_tags: Optional[List[str]] = None
+    """Valid tags of the cleanser. Defaults to DEFAULT_VALID_TAGS."""
+    valid_attrs: Optional[List[str]] = None
+    """Valid attributes of the cleanser. Defaults to DEFAULT_VALID_ATTRS."""
+    cleanser: Literal["bs4", "lxml"] = "bs4"
+    """Backend of the cleanser: 'bs4' for HTMLCleanser, 'lxml' for LXMLCleanser."""
+    splitter_kwargs: Dict[str, Any] = field(default_factory=dict)
+    """Other arguments of HTMLSplitter. (e.g., split_strategy, raise_error)"""
+    max_workers: Optional[int] = None
+    """Number of worker processes. Defaults to the number of cpus."""
+    max_in_flight: Optional[int] = None
+    """Maximum number of files being processed or waiting to be written. Defaults to 2 * max_workers."""
+    encoding: str = "utf-8"
+    """Encoding of the html files."""
+    cache_dir: Optional[str] = None
+    """Directory of the on-disk cache of the documents, shared by the workers. If None, no cache is used."""
+    cache_max_bytes: int = 1 << 30
+    """Maximum size of the cache directory, over which the least recently used documents are evicted."""
+    length_func_id: Optional[str] = None
+    """Identity of the length function in the cache key, required for an object without a stable `repr`."""
+
+    """Cleanse and split many html files across a process pool, and write the documents into a sink.
+
+    Each worker process reads, parses, cleanses and splits a file at a time, while the main
+    process submits at most `max_in_flight` files, so that the memory is bounded no matter
+    how many files there are. Documents are written to the sink in the order of completion,
+    with the path of the file in `metadata["source"]`.
+
+    Example:
+        .. code-block:: python
+
+            from splitter.pipeline import HTMLPipeline, JSONLSink
+
+            pipeline = HTMLPipeline(length_func=len, token_max=1500, cleanser="lxml", max_workers=8)
+            with JSONLSink("documents.jsonl") as sink:
+                stats = pipeline.run("YOUR_HTML_DIRECTORY", sink)
+            print(stats.summary())
+    """
+
+    def run(self, source: Union[str, Path, Iterable[Union[str, Path]]], sink: Any) -> PipelineStats:
+        """Run the pipeline over the html files.
+
+        Args:
+            source: directory of html files, a html file, or iterable of html file paths
+            sink: opened sink which has `write(documents)`, e.g., JSONLSink, ParquetSink
+
+        Returns:
+            PipelineStats
+        """
+        if self.cache_dir is not None and self.length_func_id is None:
+            # fail early, rather than failing every file in the workers
+            callable_identity(self.length_func)
+        max_workers = self.max_workers or os.cpu_count() or 1
+        max_in_flight = self.max_in_flight or 2 * max_workers
+        stats = PipelineStats()
+        start = time.perf_counter()
+
+        paths = iter_html_files(source)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(self,)) as executor:
+            in_flight: Set[Future] = set()
+            for path in paths:
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._collect(done, sink, stats)
+                in_flight.add(executor.submit(_process_file, path))
+            done, _ = wait(in_flight)
+            self._collect(done, sink, stats)
+
+        stats.elapsed = time.perf_counter() - start
+        logger.info(stats.summary())
+        return stats
+
+    def _collect(self, futures: Iterable[Future], sink: Any, stats: PipelineStats) -> None:
+        for future in futures:
+            result: _Result = future.result()
+            for stage, elapsed in result.stage_elapsed.items():
+                stats.stage_elapsed[stage] += elapsed
+            if result.error is not None:
+                stats.n_failed += 1
+                logger.error(f"Failed to process {result.path}: {result.error}")
+                continue
+            if result.cache_hit is not None:
+                stats.n_cache_hits += int(result.cache_hit)
+                stats.n_cache_misses += int(not result.cache_hit)
+
+            start = time.perf_counter()
+            sink.write(result.documents)
+            stats.stage_elapsed["write"] += time.perf_counter() - start
+            stats.n_files += 1
+            stats.n_documents += len(result.documents)
+            stats.n_bytes += result.n_bytes
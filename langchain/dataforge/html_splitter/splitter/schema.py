@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import Tuple, List
+from array import array
+from typing import Dict, Iterator, Tuple, List
 from dataclasses import dataclass, field
 
 
@@ -54,3 +55,56 @@ class Document:
     """Length counted through length_func."""
     metadata: dict = field(default_factory=dict)
     "Arbitrary metadata about the document (e.g., source, attributes, relationships to other documents, etc.)"
+
+
+class NodeTable(object):
+    """Columnar table of nodes, which keeps the start and end index and the name of
+    the nodes in arrays, instead of creating a Node object for each node.
+    Each row is read as a Node dataclass, so that it can be used as a list of nodes.
+
+    Example:
+        .. code-block:: python
+
+            table = NodeTable()
+            table.append(0, 15, "<table>")
+            node = table[0]  # Node(indice=(0, 15), name="<table>")
+    """
+
+    __slots__ = ("starts", "ends", "name_ids", "names", "_name_to_id")
+
+    def __init__(self):
+        self.starts = array("q")
+        """Start index of each node."""
+        self.ends = array("q")
+        """End index of each node."""
+        self.name_ids = array("l")
+        """Index of the name of each node in `names`."""
+        self.names: List[str] = []
+        """Distinct names of the nodes."""
+        self._name_to_id: Dict[str, int] = {}
+
+    def append(self, start: int, end: int, name: str) -> None:
+        name_id = self._name_to_id.get(name)
+        if name_id is None:
+            name_id = self._name_to_id[name] = len(self.names)
+            self.names.append(name)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.name_ids.append(name_id)
+
+    def extend(self, table: NodeTable) -> None:
+        for start, end, name_id in zip(table.starts, table.ends, table.name_ids):
+            self.append(start, end, table.names[name_id])
+
+    def name(self, i: int) -> str:
+        return self.names[self.name_ids[i]]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, i: int) -> Node:
+        return Node(indice=(self.starts[i], self.ends[i]), name=self.name(i))
+
+    def __iter__(self) -> Iterator[Node]:
+        for i in range(len(self)):
+            yield self[i]
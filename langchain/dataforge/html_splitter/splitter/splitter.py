@@ -1,12 +1,27 @@
 from __future__ import annotations
 
 import re
-from collections import defaultdict
-from typing import Callable, List
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, Iterator, List, Literal, Optional, Tuple
 from dataclasses import dataclass, field
-from bs4 import BeautifulSoup
-
-from splitter.schema import Tag, Node, Chunk, Document
+from bs4 import BeautifulSoup, Doctype, PageElement, Tag
+
+from splitter.cache import DocumentCache, callable_identity
+from splitter.dedup import ChunkDeduplicator
+from splitter.incremental import (
+    IncrementalUpdate,
+    SplitResult,
+    common_affixes,
+    find_boundary,
+    iter_page_ranges,
+    make_document,
+    shift_chunk,
+)
+from splitter.index import NodeIndex
+from splitter.length import CacheInfo, LengthCache, pack_lengths
+from splitter.schema import Node, NodeTable, Chunk, Document
+from splitter.table import parse_table
+from splitter.tokenizer import find_all_nodes, find_node_table
 
 
 @dataclass
@@ -25,6 +40,30 @@ class HTMLSplitter(object):
     """Maximum number of trials to split the single chunk."""
     raise_error: bool = True
     """Whether to raise error if any of the chunk is not splittable even with max trials."""
+    batch_length_func: Optional[Callable[[List[str]], List[int]]] = None
+    """Optional length function to count the number of tokens of many texts in one call."""
+    length_cache_size: int = 10000
+    """Maximum number of chunk lengths to keep in the length cache. 0 disables the cache."""
+    split_strategy: Literal["trial", "greedy"] = "trial"
+    """Strategy to split a single chunk exceeding the token_max.
+    'trial' splits the chunk into `split_denominator` parts, increasing it until every part fits.
+    'greedy' measures each row or sentence once and packs the largest groups under the token_max."""
+    serialization: Literal["prettify", "compact"] = "prettify"
+    """How to serialize the soup into the html to split.
+    'prettify' detects the nodes in the prettified html, and re-parses the table chunk to split it.
+    'compact' serializes the top-level nodes as they are, and splits the table by walking the parsed tree."""
+    overlap: int = 0
+    """Maximum number of tokens that consecutive documents share, made of the last chunks of the previous document."""
+    stride: Optional[int] = None
+    """Number of tokens to advance from the start of a document to the start of the next one.
+    It is an alternative to `overlap`, and both cannot be given at once."""
+    cache: Optional[DocumentCache] = None
+    """On-disk cache of the documents, checked first by `iter_documents`. Not used with a deduplicator."""
+    length_func_id: Optional[str] = None
+    """Identity of the length function in the cache key, e.g. the name of the tokenizer.
+    Required with `cache` for a lambda, a closure or an object without a stable `repr`."""
+    deduplicator: Optional[ChunkDeduplicator] = None
+    """Deduplicator to skip the chunks seen before (e.g., in the other pages) when making the documents."""
 
     """Separate the html soup object into the tags > nodes > chunks > documents.
 
@@ -80,14 +119,54 @@ class HTMLSplitter(object):
         html = re.sub(pat, "", html).strip()
         return html
 
+    def _iter_top_level(self, contents: List[PageElement]) -> Iterator[PageElement]:
+        # <html> and <body> tags are not thought of as parents
+        for element in contents:
+            if isinstance(element, Tag) and element.name in ["html", "body"]:
+                yield from self._iter_top_level(element.contents)
+            elif not isinstance(element, Doctype):
+                yield element
+
+    def _serialize_compact(self) -> str:
+        """Serialize the top-level nodes of the soup without prettifying,
+        and keep the indice of each node in the serialized html."""
+        pieces, start = [], 0
+        for element in self._iter_top_level(self.soup.contents):
+            if isinstance(element, Tag):
+                piece = element.decode()
+                self._chunk_elements[(start, start + len(piece))] = element
+            else:
+                piece = element.output_ready()
+            pieces += [piece]
+            start += len(piece)
+        return "".join(pieces)
+
     def get_tags_in_soup(self) -> List[str]:
         tags = [tag.name for tag in self.soup.find_all()]
         tags = list(set(tags))
         return tags
 
     def __post_init__(self):
-        self.html = self._cleanse_soup_tags()
+        if self.overlap < 0 or self.overlap >= self.token_max:
+            raise ValueError(f"overlap should be in [0, token_max), but got {self.overlap}.")
+        if self.stride is not None and (self.stride <= 0 or self.overlap > 0):
+            raise ValueError(f"stride should be positive and cannot be given with overlap, but got {self.stride}.")
+        # top-level nodes of the soup by their indice, only in the compact serialization
+        self._chunk_elements: Dict[Tuple[int, int], Tag] = {}
+        self.html = self._serialize_compact() if self.serialization == "compact" else self._cleanse_soup_tags()
         self.tags = self.get_tags_in_soup()
+        self.length_cache = LengthCache(
+            length_func=self.length_func,
+            batch_length_func=self.batch_length_func,
+            maxsize=self.length_cache_size,
+        )
+        if self.cache is not None and self.length_func_id is None:
+            # fail early, rather than caching the documents under an identity that is not stable
+            callable_identity(self.length_func)
+
+    def cache_info(self) -> CacheInfo:
+        """Report the hits and misses of the length cache."""
+        return self.length_cache.cache_info()
 
     def find_nodes(self, tag: str) -> List[Node]:
         """Find the nodes of which tag name is equal as given `tag`.
@@ -105,81 +184,55 @@ class HTMLSplitter(object):
             splitter = HTMLSplitter(soup, length_func=len, token_max=1500)
             nodes = splitter.find_nodes('table')
         """
-        tag_counter = defaultdict(int)
-        nodes = []
-
-        pat = re.compile(rf"<.*{tag}>")
-        match = pat.search(self.html)
-
-        tags = []
-        while match:
-            # get matched_tag. e.g. <table>, </table>
-            matched_tag = match.group(0)
-            # count depth of matched_tag to do pairing later
-            tag_counter[matched_tag] += 1
-            depth = tag_counter[matched_tag]
-            tags += [Tag(indice=match.span(), name=matched_tag, metadata={"depth": depth})]
-            # get pair_tag. e.g, <table> -> </table>
-            pair_matched_tag = rf"</{tag}>" if r"/" not in matched_tag else matched_tag.replace(r"/", "")
-
-            # recognize as Node if depth tags with each other
-            if depth == tag_counter[pair_matched_tag]:
-                # pairing tags according to the matching depth
-                tags = sorted(tags, key=lambda x: x.metadata["depth"])
-                start, end = tags[0], tags[-1]
-                indice = start.indice + end.indice
-                start_idx, end_idx = min(indice), max(indice)
-                tag_name = start.name
-                nodes += [Node(indice=(start_idx, end_idx), name=tag_name)]
-                # reset after chunking done
-                tags = []
-                tag_counter[matched_tag], tag_counter[pair_matched_tag] = 0, 0
-            match = pat.search(self.html, match.start() + 1)
-
-        return nodes
-
-    def _find_parent_child_nodes(self, node: Node, nodes: List[Node]) -> None:
-        start, end = node.indice
-
-        # initialize parent candidates
-        parent_cands = []
-        # exclude the self from the list
+        return find_all_nodes(self.html, [tag])[tag]
+
+    def find_node_table(self, tag: str) -> NodeTable:
+        """Same as `find_nodes`, but fill a columnar NodeTable without creating a Node object per node.
+        Each row of the table is still read as a Node, e.g. `table[0]` or `list(table)`.
+
+        Returns:
+            NodeTable
+        """
+        return find_node_table(self.html, [tag])
+
+    def iter_chunks(self) -> Iterator[Chunk]:
+        """Iterate over the chunks of the html, without keeping them in `self.chunks`.
+
+        Returns:
+            Iterator of Chunks
+        """
+        if self.serialization == "compact":
+            yield from self._iter_compact_chunks()
+            return
+
+        # find nodes of all the tags with a single scan over the html, into a columnar table
+        table = find_node_table(self.html, self.tags)
+        # find the nearest parent of each node with the interval index.
         # note. the node with the same name (tag name) cannot be its parent
-        _nodes = [_node for _node in nodes if _node != node and _node.name != node.name]
-        for _node in _nodes:
-            _start, _end = _node.indice
-            if _start < start and _end > end:
-                parent_cands += [_node]
-
-        # find neareast parent from the candidates
-        if len(parent_cands) > 0:
-            parent = parent_cands[0]
-            min_gap = abs(parent.indice[0] - start)
-            for cand in parent_cands:
-                gap = abs(cand.indice[0] - start)
-                if gap < min_gap:
-                    parent = cand
-                    min_gap = gap
-
-            # add parent and child information to each other
-            parent.child += [node]
-            node.parent += [parent]
-
-    def _sort_parent_child_nodes(self, nodes: List[Node]):
-        for node in nodes:
-            childs = sorted(node.child, key=lambda x: x.indice[0], reverse=False)
-            parents = sorted(node.parent, key=lambda x: x.indice[0], reverse=False)
-
-            node.child = childs
-            node.parent = parents
-        return nodes
-
-    def _get_chunk_nodes(self, nodes: List[Node]):
-        # filter and get the nodes with no parents,
-        # which are considered as chunks of html.
-        _nodes = [node for node in nodes if len(node.parent) == 0]
-        _nodes = sorted(_nodes, key=lambda x: x.indice[0], reverse=False)
-        return _nodes
+        parents = NodeIndex(table).find_parent_positions()
+        # the nodes with no parents are considered as chunks of html.
+        chunk_positions = sorted((i for i in range(len(table)) if parents[i] == -1), key=table.starts.__getitem__)
+
+        # yield chunks
+        start = 0
+        for i in chunk_positions:
+            _start, _end = table.starts[i], table.ends[i]
+            if start != _start:
+                yield Chunk(indice=(start, _start), content=self.html[start:_start], metadata={"type": "string"})
+            _type = re.sub(r"<|>", "", table.name(i))
+            yield Chunk(indice=(_start, _end), content=self.html[_start:_end], metadata={"type": _type})
+            start = _end
+
+    def _iter_compact_chunks(self) -> Iterator[Chunk]:
+        # the top-level nodes are already known from the compact serialization
+        start = 0
+        for (_start, _end), element in self._chunk_elements.items():
+            if start != _start:
+                yield Chunk(indice=(start, _start), content=self.html[start:_start], metadata={"type": "string"})
+            yield Chunk(indice=(_start, _end), content=self.html[_start:_end], metadata={"type": element.name})
+            start = _end
+        if start != len(self.html):
+            yield Chunk(indice=(start, len(self.html)), content=self.html[start:], metadata={"type": "string"})
 
     def get_chunks(self) -> List[Chunk]:
         """Split the html into several chunks.
@@ -197,32 +250,7 @@ class HTMLSplitter(object):
             chunks = splitter.get_chunks()
             assert ''.join([chunk.content for chunk in chunks]) == splitter.html
         """
-
-        # find nodes
-        nodes = []
-        for tag in self.tags:
-            nodes.extend(self.find_nodes(tag))
-
-        # update parent and child relationship of each node
-        for node in nodes:
-            self._find_parent_child_nodes(node, nodes)
-        # sort according to the start index of the child or parent nodes
-        nodes = self._sort_parent_child_nodes(nodes)
-        # get chunk_nodes
-        chunk_nodes = self._get_chunk_nodes(nodes)
-
-        # append to chunks
-        start = 0
-        for node in chunk_nodes:
-            _start, _end = node.indice
-            if start != _start:
-                self.chunks += [
-                    Chunk(indice=(start, _start), content=self.html[start:_start], metadata={"type": "string"})
-                ]
-            _type = re.sub(r"<|>", "", node.name)
-            self.chunks += [Chunk(indice=(_start, _end), content=self.html[_start:_end], metadata={"type": _type})]
-            start = _end
-
+        self.chunks += list(self.iter_chunks())
         return self.chunks
 
     def _split_chunk(self, chunk: Chunk) -> List[Chunk]:
@@ -235,39 +263,20 @@ class HTMLSplitter(object):
             List of chunks
         """
 
-        def make_rows_as_table(soup, th_rows, rows):
-            table = soup.new_tag("table")
-            table.extend(th_rows)
-            table.extend(rows)
-            return table
-
         _chunks = []
 
         if chunk.metadata["type"] == "table":
-            soup = BeautifulSoup(chunk.content, "lxml")
-            table = soup.find("table")
-
-            # separate rows with general `rows` and `th rows`
-            all_rows = table.find_all("tr")
-            th_rows = []
-            for i, row in enumerate(all_rows):
-                if len(row.find_all("th")) > 0:
-                    th_rows += [all_rows.pop(i)]
+            # the header rows are repeated in every part, and the rows of the nested tables stay in their cells
+            th_rows, all_rows = self._get_table_rows(chunk)
 
             # divide the single chunk into chunks
             quotient = len(all_rows) // self.split_denominator
             quotient = 1 if quotient == 0 else quotient
 
+            head, tail = self._get_table_head_tail(th_rows)
             for i in range(0, len(all_rows), quotient):
-                rows = all_rows[i : i + quotient]
-                new_table = make_rows_as_table(soup, th_rows, rows)
-                _chunks += [
-                    Chunk(
-                        indice=None,  # [TODO] how to specify indice
-                        content=new_table.prettify(),
-                        metadata={"type": "table"},
-                    )
-                ]
+                rows = "".join(self._render_rows(all_rows[i : i + quotient]))
+                _chunks += [Chunk(indice=None, content=head + rows + tail, metadata={"type": "table"})]
         # overide here if you have your own valid tags.
         # chunk.metadata["type"] == "string"
         else:
@@ -281,20 +290,164 @@ class HTMLSplitter(object):
                 _chunks += [Chunk(indice=(0, 0), content=new_chunk, metadata={"type": "string"})]
         return _chunks
 
-    def split_chunks(self, chunks: List[Chunk]) -> List[Chunk]:
-        """Iterate over all the chunks and separate them
-        to guarantee that there is no any length of the chunk
-        exceeds the token_max
+    def _get_table_rows(self, chunk: Chunk) -> Tuple[List[Tag], List[Tag]]:
+        """Separate rows of the table chunk with `th rows` and general `rows`,
+        except for the rows of the nested tables which belong to a cell.
+        In the compact serialization, the table is taken from the parsed tree without re-parsing."""
+        table = self._chunk_elements.get(chunk.indice)
+        if table is None:
+            table = BeautifulSoup(chunk.content, "lxml").find("table")
+
+        all_rows = [row for row in table.find_all("tr") if row.find_parent("table") is table]
+        th_rows = [row for row in all_rows if len(row.find_all("th", recursive=False)) > 0]
+        rows = [row for row in all_rows if len(row.find_all("th", recursive=False)) == 0]
+        return th_rows, rows
+
+    def _render_rows(self, rows: List[Tag]) -> List[str]:
+        # prettified rows are indented as they are inside the new table
+        indent_level = 1 if self.serialization == "prettify" else None
+        return [row.decode(indent_level=indent_level) for row in rows]
+
+    def _get_table_head_tail(self, th_rows: List[Tag]) -> Tuple[str, str]:
+        newline = "\n" if self.serialization == "prettify" else ""
+        head = "<table>" + newline + "".join(self._render_rows(th_rows))
+        tail = "</table>" + newline
+        return head, tail
+
+    def _pack_units(self, units: List[str], head: str = "", tail: str = "") -> List[Tuple[int, int]]:
+        """Pack the units (rows or sentences) into the largest groups under the token_max,
+        of which content is `head + units[start:end] + tail`.
+        It is used in the `_split_chunk_greedy` internally."""
+        overhead = self.length_cache(head + tail) if len(head + tail) > 0 else 0
+        lengths = self.length_cache.get_many(units)
+        budget = self.token_max - overhead
+
+        # the length of joined units may differ from the sum of their lengths (e.g. tokenizer),
+        # so the group exceeding the token_max is packed again with the budget reduced by the excess.
+        groups = []
+        stack = pack_lengths(lengths, budget)[::-1]
+        while len(stack) > 0:
+            start, end = stack.pop()
+            if end - start > 1:
+                excess = self.length_cache(head + "".join(units[start:end]) + tail) - self.token_max
+                if excess > 0:
+                    sub_budget = min(budget, sum(lengths[start:end])) - excess
+                    sub_groups = pack_lengths(lengths[start:end], sub_budget)
+                    stack += [(start + i, start + j) for i, j in sub_groups][::-1]
+                    continue
+            groups += [(start, end)]
+        return groups
+
+    def _split_table(self, chunk: Chunk) -> Optional[List[Chunk]]:
+        """Split the table chunk into the sub-tables of row ranges, parsing the table once into the grid.
+
+        Each sub-table is the html of the table before its first row, the header rows,
+        the range of the rows and the html after its last row, all sliced from the chunk as they are.
+        The rows bound by a rowspan are kept in the same sub-table, the length of each block
+        of rows is measured once, and `indice` is the range of the rows in the html.
+        It is used in the `_split_chunk_greedy` internally.
+
+        Returns:
+            List of chunks, or None if the table is not parsed into the grid
+        """
+        table = self._chunk_elements.get(chunk.indice)
+        if table is None:
+            table = BeautifulSoup(chunk.content, "lxml").find("table")
+        grid = None if table is None else parse_table(table, chunk.content)
+        if grid is None:
+            return None
+        blocks = [(start, end) for start, end in grid.blocks if start >= grid.header]
+        if len(blocks) == 0:
+            return None
+
+        content, row_spans = chunk.content, grid.row_spans
+        head = content[: row_spans[grid.header][0]]
+        tail = content[row_spans[-1][1] :]
+        # each unit is a block of rows with the html up to the next block
+        starts = [row_spans[start][0] for start, _ in blocks] + [row_spans[-1][1]]
+        units = [content[starts[i] : starts[i + 1]] for i in range(len(blocks))]
+
+        _chunks = []
+        for start, end in self._pack_units(units, head, tail):
+            indice = None
+            if chunk.indice is not None:
+                indice = (chunk.indice[0] + starts[start], chunk.indice[0] + starts[end])
+            metadata = {"type": "table", "rows": (blocks[start][0], blocks[end - 1][1]), "header": grid.header}
+            _chunks += [Chunk(indice=indice, content=head + "".join(units[start:end]) + tail, metadata=metadata)]
+        return _chunks
+
+    def _split_chunk_greedy(self, chunk: Chunk) -> List[Chunk]:
+        """Split a single chunk, of which length is larger than token_max,
+        into the largest groups of rows (table) or sentences (string) under the token_max.
+        Unlike `_split_chunk`, each row or sentence is measured only once,
+        and the groups are found from the prefix sums of their lengths.
 
         Args:
-            chunks: List of chunks
+            chunk: chunk of the document
         Returns:
             List of chunks
         """
-        lengths = [self.length_func(chunk.content) for chunk in chunks]
-        new_chunks = []
-        for chunk, length in zip(chunks, lengths):
-            if length > self.token_max:
+        if chunk.metadata["type"] == "table":
+            table_chunks = self._split_table(chunk)
+            if table_chunks is not None:
+                return table_chunks
+
+            th_rows, rows = self._get_table_rows(chunk)
+            if len(rows) == 0:
+                return [chunk]
+
+            # render each row once
+            head, tail = self._get_table_head_tail(th_rows)
+            units = self._render_rows(rows)
+            return [
+                Chunk(indice=None, content=head + "".join(units[start:end]) + tail, metadata={"type": "table"})
+                for start, end in self._pack_units(units, head, tail)
+            ]
+        # overide here if you have your own valid tags.
+        # chunk.metadata["type"] == "string"
+        else:
+            # keep the period at the end of each sentence not to alter the content
+            sentences = [sentence for sentence in re.split(r"(?<=\.)", chunk.content) if len(sentence) > 0]
+            offsets = list(accumulate([len(sentence) for sentence in sentences], initial=0))
+            _chunks = []
+            for start, end in self._pack_units(sentences):
+                indice = None
+                if chunk.indice is not None:
+                    indice = (chunk.indice[0] + offsets[start], chunk.indice[0] + offsets[end])
+                _chunks += [Chunk(indice=indice, content="".join(sentences[start:end]), metadata={"type": "string"})]
+            return _chunks
+
+    def _prefetch_lengths(self, chunks: List[Chunk]) -> None:
+        """Count the lengths of all the chunks at once in advance,
+        when the batched length function is provided."""
+        self.length_cache.prefetch([chunk.content for chunk in chunks])
+
+    def _iter_split_chunks(self, chunks: Iterable[Chunk]) -> Iterator[Chunk]:
+        """Iterate over the chunks and yield the chunks that do not exceed the token_max.
+        It is used in the `split_chunks` and `iter_documents` internally."""
+        for chunk in chunks:
+            length = self.length_cache(chunk.content)
+            if length > self.token_max and self.split_strategy == "greedy":
+                splitted_chunks = self._split_chunk_greedy(chunk)
+                chunk_lengths = self.length_cache.get_many([_chunk.content for _chunk in splitted_chunks])
+                if max(chunk_lengths) > self.token_max:
+                    # a single row or sentence exceeds the token_max
+                    if self.raise_error:
+                        raise ValueError(
+                            f"Chunk is not splittable into the parts shorter than the token_max.\n \
+    A single row or sentence of the chunk is still longer than the token_max.\n \
+    Increase the token_max, or see if the Chunk is splittable.\n \
+    chunk indice: {chunk.indice}\n \
+    chunk type: {chunk.metadata.get('type')}"
+                        )
+                    else:
+                        print(
+                            f"The length of chunk `{chunk.metadata.get('type')}: {chunk.indice}` "
+                            "exceeds the token_max, but failed to split the chunk.\n"
+                            "A single row or sentence of the chunk exceeds the token_max."
+                        )
+                yield from splitted_chunks
+            elif length > self.token_max:
                 n_trial = 1
                 # check single chunk exceeds the token_max
                 # if true, recursively split the chunk into several chunks
@@ -317,14 +470,14 @@ class HTMLSplitter(object):
                                 "A single row of the table may exceed the token_max, \n"
                                 f"or the split function for {chunk.metadata.get('type')} has not been developped."
                             )
-                            new_chunks.append(chunk)
+                            yield chunk
                             break
                     splitted_chunks = self._split_chunk(chunk)
 
                     # count the num_token of splitted chunks
                     length = None
-                    for _chunk in splitted_chunks:
-                        chunk_length = self.length_func(_chunk.content)
+                    chunk_lengths = self.length_cache.get_many([_chunk.content for _chunk in splitted_chunks])
+                    for chunk_length in chunk_lengths:
                         if chunk_length > self.token_max:
                             length = chunk_length
                             break
@@ -332,43 +485,275 @@ class HTMLSplitter(object):
                     self.split_denominator += 1
                     n_trial += 1
 
-                new_chunks.extend(splitted_chunks)
+                yield from splitted_chunks
             else:
-                new_chunks.append(chunk)
-        return new_chunks
+                yield chunk
 
-    def make_documents(self, chunks: List[Chunk]) -> List[Document]:
-        """Merge separated chunks into the set of documents
-        before putting into the llm model.
-        It takes into account of the token_max and merges the chunks
-        continuously, until the length of the merged chunks does not
-        exceed the token_max.
+    def split_chunks(self, chunks: List[Chunk]) -> List[Chunk]:
+        """Iterate over all the chunks and separate them
+        to guarantee that there is no any length of the chunk
+        exceeds the token_max
 
         Args:
             chunks: List of chunks
         Returns:
-            List of documents
+            List of chunks
         """
-        new_docs = []
+        self._prefetch_lengths(chunks)
+        return list(self._iter_split_chunks(chunks))
+
+    def _iter_documents(self, chunks: Iterable[Chunk]) -> Iterator[Document]:
+        """Merge the chunks continuously and yield a document as soon as
+        the length of the merged chunks exceeds the token_max.
+        It is used in the `make_documents` and `iter_documents` internally."""
         _sub_chunks = []
-        lengths = [self.length_func(chunk.content) for chunk in chunks]
         cum_length, page_cnt = 0, 0
 
-        for chunk, length in zip(chunks, lengths):
+        for chunk in chunks:
+            length = self.length_cache(chunk.content)
             _sub_chunks.append(chunk)
             cum_length += length
             if cum_length > self.token_max:
-                document = Document(
+                yield Document(
                     page=page_cnt,
                     page_content="".join([chunk.content for chunk in _sub_chunks[:-1]]),
                     length=cum_length - length,
                 )
-                new_docs += [document]
                 page_cnt += 1
                 _sub_chunks = _sub_chunks[-1:]
                 cum_length = length
-        document = Document(
-            page=page_cnt, page_content="".join([chunk.content for chunk in _sub_chunks]), length=cum_length
+        yield Document(page=page_cnt, page_content="".join([chunk.content for chunk in _sub_chunks]), length=cum_length)
+
+    def _iter_window_documents(self, chunks: Iterable[Chunk]) -> Iterator[Document]:
+        """Merge the chunks into overlapping windows under the token_max.
+        It is used instead of `_iter_documents` when `overlap` or `stride` is given.
+
+        The chunks of the current window are buffered with their (cached) lengths.
+        Once the next chunk does not fit, the window is made as a document with a single join,
+        and the next window starts from the last chunks of it sharing at most `overlap`
+        tokens (or from `stride` tokens after its start), so that no chunk is measured twice.
+        """
+        window: List[Chunk] = []
+        lengths: List[int] = []
+        cum_length, page_cnt = 0, 0
+
+        for chunk in chunks:
+            length = self.length_cache(chunk.content)
+            window.append(chunk)
+            lengths.append(length)
+            cum_length += length
+            if len(window) == 1 or cum_length <= self.token_max:
+                continue
+
+            yield Document(
+                page=page_cnt,
+                page_content="".join([_chunk.content for _chunk in window[:-1]]),
+                length=cum_length - length,
+            )
+            page_cnt += 1
+
+            # suffix[i] is the sum of lengths[i:], and prefix[i] is the sum of lengths[:i]
+            suffix = list(accumulate(reversed(lengths), initial=0))[::-1]
+            prefix = list(accumulate(lengths, initial=0))
+            # start of the next window, which advances at least a chunk and keeps the new chunk
+            start, last = 1, len(window) - 1
+            if self.stride is None:
+                while start < last and suffix[start] - length > self.overlap:
+                    start += 1
+            else:
+                while start < last and prefix[start] < self.stride:
+                    start += 1
+            while start < last and suffix[start] > self.token_max:
+                start += 1
+            window, lengths = window[start:], lengths[start:]
+            cum_length = suffix[start]
+
+        if len(window) > 0:
+            yield Document(page=page_cnt, page_content="".join([chunk.content for chunk in window]), length=cum_length)
+
+    def _assemble_documents(self, chunks: Iterable[Chunk]) -> Iterator[Document]:
+        if self.deduplicator is not None:
+            chunks = self.deduplicator.iter_unique(chunks, self.length_cache)
+        if self.overlap > 0 or self.stride is not None:
+            return self._iter_window_documents(chunks)
+        return self._iter_documents(chunks)
+
+    def make_documents(self, chunks: List[Chunk]) -> List[Document]:
+        """Merge separated chunks into the set of documents
+        before putting into the llm model.
+        It takes into account of the token_max and merges the chunks
+        continuously, until the length of the merged chunks does not
+        exceed the token_max.
+
+        Args:
+            chunks: List of chunks
+        Returns:
+            List of documents
+        """
+        self._prefetch_lengths(chunks)
+        return list(self._assemble_documents(chunks))
+
+    def iter_documents(self) -> Iterator[Document]:
+        """Stream the html through chunking, splitting and merging, and yield
+        each document as soon as it is made. Unlike calling `get_chunks`,
+        `split_chunks` and `make_documents` in turn, no list of the whole
+        chunks is kept, so that only the chunks of the current document are held.
+
+        Returns:
+            Iterator of documents
+
+        Example:
+            .. code-block:: python
+            txt="YOUR_HTML"
+            soup = BeautifulSoup(txt, 'lxml')
+            splitter = HTMLSplitter(soup, length_func=len, token_max=1500)
+            for document in splitter.iter_documents():
+                print(document.page, document.length)
+
+        If `cache` is given, the documents of the same html and arguments are
+        read from the cache instead, and the new ones are cached once all of them are made.
+        """
+        # documents with a deduplicator depend on the chunks seen before, not only on the html
+        if self.cache is None or self.deduplicator is not None:
+            chunks = self.iter_chunks()
+            chunks = self._iter_split_chunks(chunks)
+            yield from self._assemble_documents(chunks)
+            return
+
+        key = self.cache.make_key(
+            self.html,
+            token_max=self.token_max,
+            length_func=self.length_func,
+            length_func_id=self.length_func_id,
+            split_denominator=self.split_denominator,
+            split_trial_max=self.split_trial_max,
+            raise_error=self.raise_error,
+            split_strategy=self.split_strategy,
+            serialization=self.serialization,
+            overlap=self.overlap,
+            stride=self.stride,
+        )
+        documents = self.cache.get(key)
+        if documents is None:
+            documents = []
+            for document in self._assemble_documents(self._iter_split_chunks(self.iter_chunks())):
+                documents += [document]
+                yield document
+            self.cache.put(key, documents)
+        else:
+            yield from documents
+
+    def _check_incremental(self) -> None:
+        if self.overlap > 0 or self.stride is not None or self.deduplicator is not None:
+            raise ValueError("Incremental splitting does not support overlap, stride or deduplicator.")
+
+    def _split_top_level(self, chunk: Chunk) -> Tuple[List[Chunk], List[int]]:
+        # the trial split increases split_denominator; restore it so that each chunk is split
+        # independently of the chunks before it, and the split chunks can be reused after an edit
+        split_denominator = self.split_denominator
+        pieces = list(self._iter_split_chunks([chunk]))
+        self.split_denominator = split_denominator
+        return pieces, self.length_cache.get_many([piece.content for piece in pieces])
+
+    def split(self) -> SplitResult:
+        """Split the html into the documents as `iter_documents` does, keeping how each
+        top-level chunk is split and where each document starts, to `resplit` the edited html later.
+        Unlike `split_chunks`, each top-level chunk starts the trial split from the same `split_denominator`.
+
+        Returns:
+            SplitResult, of which documents have a stable `id` in the metadata
+        """
+        self._check_incremental()
+        chunks = list(self.iter_chunks())
+        pieces, lengths = [], []
+        for chunk in chunks:
+            _pieces, _lengths = self._split_top_level(chunk)
+            pieces += [_pieces]
+            lengths += [_lengths]
+
+        result = SplitResult(chunks=chunks, pieces=pieces, lengths=lengths, boundaries=[], documents=[])
+        flat_pieces, flat_lengths = result.flat_pieces(), result.flat_lengths()
+        for start, end in iter_page_ranges(flat_lengths, self.token_max):
+            result.documents += [make_document(len(result.documents), flat_pieces, flat_lengths, start, end)]
+            result.boundaries += [start]
+        return result
+
+    def resplit(self, previous: SplitResult) -> IncrementalUpdate:
+        """Split the edited html incrementally from the split result of the previous html.
+
+        The top-level chunks of the same content at the head and tail of both html
+        keep their split chunks (moved to the new offsets), and only the edited ones in-between
+        are split again. The documents ending before the edited chunks are kept, and the
+        documents are packed again from there only until a document starts at the same
+        chunk as before after the edited ones, from which the previous documents are reused.
+        As the `id` of a document is made from its content, unchanged documents keep their ids.
+
+        Args:
+            previous: result of `split` or `resplit` of the previous html, with the same arguments
+
+        Returns:
+            IncrementalUpdate with the new result, and the added and removed documents
+
+        Example:
+            .. code-block:: python
+            result = HTMLSplitter(soup, length_func=len, token_max=1500).split()
+            update = HTMLSplitter(new_soup, length_func=len, token_max=1500).resplit(result)
+            upsert(update.added)
+            delete(update.removed_ids)
+        """
+        self._check_incremental()
+        chunks = list(self.iter_chunks())
+        prefix, suffix = common_affixes(previous.chunks, chunks)
+        pieces, lengths = previous.pieces[:prefix], previous.lengths[:prefix]
+        for chunk in chunks[prefix : len(chunks) - suffix]:
+            _pieces, _lengths = self._split_top_level(chunk)
+            pieces += [_pieces]
+            lengths += [_lengths]
+        for i in range(len(previous.chunks) - suffix, len(previous.chunks)):
+            offset = chunks[i - len(previous.chunks) + len(chunks)].indice[0] - previous.chunks[i].indice[0]
+            pieces += [[shift_chunk(piece, offset) for piece in previous.pieces[i]]]
+            lengths += [previous.lengths[i]]
+
+        result = SplitResult(chunks=chunks, pieces=pieces, lengths=lengths, boundaries=[], documents=[])
+        flat_pieces, flat_lengths = result.flat_pieces(), result.flat_lengths()
+        # position of the edited split chunks, and the shift of the positions after them
+        edited_start = sum(len(_pieces) for _pieces in pieces[:prefix])
+        edited_end = sum(len(_pieces) for _pieces in pieces[: len(chunks) - suffix])
+        shift = len(flat_lengths) - sum(len(_lengths) for _lengths in previous.lengths)
+
+        # keep the documents of which chunks and the next (overflowing) chunk are not edited
+        n_kept = 0
+        while n_kept < len(previous.documents) - 1 and previous.boundaries[n_kept + 1] < edited_start:
+            n_kept += 1
+        result.boundaries = previous.boundaries[:n_kept]
+        result.documents = previous.documents[:n_kept]
+
+        start = previous.boundaries[n_kept] if n_kept < len(previous.boundaries) else 0
+        for start, end in iter_page_ranges(flat_lengths, self.token_max, start=start):
+            # no resync at the first chunk, which may make an empty first document the previous split did not have
+            resync = find_boundary(previous.boundaries, start - shift) if start >= max(edited_end, 1) else None
+            if resync is not None:
+                # the same chunks follow, so that the rest of the documents are the same as before
+                for document in previous.documents[resync:]:
+                    result.documents += [
+                        Document(
+                            page=len(result.documents),
+                            page_content=document.page_content,
+                            length=document.length,
+                            metadata=dict(document.metadata),
+                        )
+                    ]
+                result.boundaries += [boundary + shift for boundary in previous.boundaries[resync:]]
+                break
+            result.documents += [make_document(len(result.documents), flat_pieces, flat_lengths, start, end)]
+            result.boundaries += [start]
+
+        previous_ids = {document.metadata["id"] for document in previous.documents}
+        ids = {document.metadata["id"] for document in result.documents}
+        return IncrementalUpdate(
+            result=result,
+            added=[document for document in result.documents if document.metadata["id"] not in previous_ids],
+            removed_ids=sorted(previous_ids - ids),
+            n_resplit=len(chunks) - prefix - suffix,
+            n_reused=prefix + suffix,
         )
-        new_docs += [document]
-        return new_docs
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from bs4 import Tag
+
+# start and closed tags of the table and its rows, to locate the rows in the html
+_TABLE_ROW_TAG = re.compile(r"<(/?)(table|tr)\b[^>]*>", re.IGNORECASE)
+
+
+@dataclass
+class TableGrid:
+    n_rows: int
+    """Number of rows of the table, except for the rows of the nested tables."""
+    row_spans: List[Tuple[int, int]]
+    """(start, end) index of each row in the html of the table, including its indentation and newline."""
+    header: int
+    """Number of the leading header rows, which are repeated in every sub-table."""
+    blocks: List[Tuple[int, int]]
+    """(start, end) ranges of the rows which cannot be separated, as a rowspan binds them."""
+
+
+def _span_value(cell: Tag, attr: str) -> int:
+    try:
+        return max(int(cell.get(attr, 1)), 0)
+    except (TypeError, ValueError):
+        return 1
+
+
+def find_row_spans(html: str) -> List[Tuple[int, int]]:
+    """Find the (start, end) index of the rows of the table, skipping the rows of the nested tables.
+    The span of a row is extended over its indentation and the newline after it, if any,
+    so that the rows in a range are contiguous in the prettified html."""
+    spans = []
+    depth, start = 0, None
+    for matched in _TABLE_ROW_TAG.finditer(html):
+        closed, name = matched.group(1) == "/", matched.group(2).lower()
+        if name == "table":
+            depth += -1 if closed else 1
+        elif depth == 1 and not closed:
+            start = matched.start()
+        elif depth == 1 and start is not None:
+            line_start = html.rfind("\n", 0, start) + 1
+            if html[line_start:start].strip() != "":
+                line_start = start
+            end = matched.end()
+            end = end + 1 if html[end : end + 1] == "\n" else end
+            spans += [(line_start, end)]
+            start = None
+    return spans
+
+
+def parse_table(table: Tag, html: str) -> Optional[TableGrid]:
+    """Parse the table once into the grid of its rows, aware of rowspan.
+
+    The header is the rows inside `thead`, or the leading rows of which cells are all `th`.
+    A rowspan binds the rows it spans into a block, so that a sub-table never
+    cuts the cell. The header is extended to the end of its block likewise.
+
+    Args:
+        table: parsed table tag
+        html: html of the table, where the rows are located
+
+    Returns:
+        TableGrid, or None if the rows of the parsed table and the html do not match
+    """
+    rows = [row for row in table.find_all("tr") if row.find_parent("table") is table]
+    row_spans = find_row_spans(html)
+    if len(rows) == 0 or len(rows) != len(row_spans):
+        return None
+
+    n_rows = len(rows)
+    # last row reached by the rowspans of each row
+    reach = []
+    for i, row in enumerate(rows):
+        last = i
+        for cell in row.find_all(["td", "th"], recursive=False):
+            rowspan = _span_value(cell, "rowspan")
+            # rowspan="0" spans to the last row
+            rowspan = n_rows - i if rowspan == 0 else rowspan
+            last = max(last, min(i + rowspan, n_rows) - 1)
+        reach += [last]
+
+    blocks = []
+    start, end = 0, 0
+    for i in range(n_rows):
+        end = max(end, reach[i])
+        if i == end:
+            blocks += [(start, i + 1)]
+            start = i + 1
+
+    header = 0
+    for row in rows:
+        cells = row.find_all(["td", "th"], recursive=False)
+        is_header = row.parent.name == "thead" or (len(cells) > 0 and all(cell.name == "th" for cell in cells))
+        if not is_header:
+            break
+        header += 1
+    if header > 0:
+        header = next(_end for _start, _end in blocks if _end >= header)
+    if header == n_rows:
+        # no body to split under the header
+        header = 0
+
+    return TableGrid(n_rows=n_rows, row_spans=row_spans, header=header, blocks=blocks)
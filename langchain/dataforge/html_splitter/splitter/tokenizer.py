@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from splitter.schema import Node, NodeTable
+
+
+def iter_matches(html: str, tags: Iterable[str]) -> Iterator[Tuple[str, int, int]]:
+    """Scan the html once and yield every tag matched by any of the given tag names.
+
+    It gives exactly the same matches as searching r"<.*{tag}>" for each tag
+    and restarting the search right after the start of the previous match,
+    but visits each line of the html only once regardless of the number of tags.
+    Since `.` does not match a newline, a match never crosses a line; and as `.*`
+    is greedy, the match starting at any '<' ends at the last '{tag}>' of the line.
+
+    Args:
+        html: html string to scan
+        tags: tag names to detect. e.g. ["table", "p"]
+
+    Returns:
+        Iterator of (tag name, start index, end index) ordered by the start index of the match.
+    """
+    names = set(tags)
+    if len(names) == 0:
+        return
+    max_len = max(len(name) for name in names)
+
+    pos, html_len = 0, len(html)
+    while pos < html_len:
+        eol = html.find("\n", pos)
+        eol = html_len if eol == -1 else eol
+        first_lt = html.find("<", pos, eol)
+
+        if first_lt != -1:
+            # end index of the last '{tag}>' in the line, for each tag
+            last_ends: Dict[str, int] = {}
+            gt = html.find(">", first_lt + 1, eol)
+            while gt != -1:
+                for size in range(1, min(max_len, gt - first_lt - 1) + 1):
+                    name = html[gt - size : gt]
+                    if name in names:
+                        last_ends[name] = gt + 1
+                gt = html.find(">", gt + 1, eol)
+
+            lt = first_lt if len(last_ends) > 0 else -1
+            while lt != -1:
+                for name, end in last_ends.items():
+                    # the tag name should start after '<', with any characters (even none) in-between as `.*`
+                    if end - 1 - len(name) > lt:
+                        yield name, lt, end
+                lt = html.find("<", lt + 1, eol)
+
+        pos = eol + 1
+
+
+def find_node_tables(html: str, tags: Iterable[str]) -> Dict[str, NodeTable]:
+    """Find the nodes of all the given tags with a single scan over the html,
+    filling a columnar NodeTable for each tag instead of creating Tag and Node objects.
+
+    Tags of the same name are paired by counting the depth of the start and
+    closed tags; a node is recognized once both counts are equal, which
+    makes the outermost pair of nested tags of the same name a single node.
+    The node spans from the first tag of the smallest depth to the last tag
+    of the largest depth among the tags matched since the previous node.
+
+    Args:
+        html: html string to scan
+        tags: tag names to find the nodes of
+
+    Returns:
+        Dictionary of tag name to its NodeTable, ordered by the end of the node.
+    """
+    tags = list(dict.fromkeys(tags))
+    tag_counters = {tag: defaultdict(int) for tag in tags}
+    # (depth, start, end) of the first shallowest and the last deepest tag matched since the previous node
+    shallowest: Dict[str, Tuple[int, int, int]] = {}
+    deepest: Dict[str, Tuple[int, int, int]] = {}
+    tables = {tag: NodeTable() for tag in tags}
+
+    for tag, start, end in iter_matches(html, tags):
+        name = html[start:end]
+        # count depth of matched_tag to do pairing later
+        tag_counter = tag_counters[tag]
+        tag_counter[name] += 1
+        depth = tag_counter[name]
+        if tag not in shallowest or depth < shallowest[tag][0]:
+            shallowest[tag] = (depth, start, end)
+        if tag not in deepest or depth >= deepest[tag][0]:
+            deepest[tag] = (depth, start, end)
+        # get pair_tag. e.g, <table> -> </table>
+        pair_matched_tag = rf"</{tag}>" if r"/" not in name else name.replace(r"/", "")
+
+        # recognize as Node if depth tags with each other
+        if depth == tag_counter[pair_matched_tag]:
+            _, first_start, first_end = shallowest.pop(tag)
+            _, last_start, last_end = deepest.pop(tag)
+            indice = (first_start, first_end, last_start, last_end)
+            tables[tag].append(min(indice), max(indice), html[first_start:first_end])
+            # reset after chunking done
+            tag_counter[name], tag_counter[pair_matched_tag] = 0, 0
+
+    return tables
+
+
+def find_node_table(html: str, tags: Iterable[str]) -> NodeTable:
+    """Find the nodes of all the given tags into a single NodeTable, grouped in the order of the tags."""
+    table = NodeTable()
+    for tag_table in find_node_tables(html, tags).values():
+        table.extend(tag_table)
+    return table
+
+
+def find_all_nodes(html: str, tags: Iterable[str]) -> Dict[str, List[Node]]:
+    """Same as `find_node_tables`, but return the list of Nodes of each tag."""
+    return {tag: list(table) for tag, table in find_node_tables(html, tags).items()}
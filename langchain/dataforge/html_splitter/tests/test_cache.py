@@ -0,0 +1,77 @@
+import functools
+
+import pytest
+from bs4 import BeautifulSoup
+
+from splitter.cache import DocumentCache, callable_identity
+from splitter.splitter import HTMLSplitter
+
+
+class Tokenizer:
+    def __init__(self, name: str):
+        self.name = name
+
+    def encode(self, text: str) -> list:
+        return text.split()
+
+    def count(self, text: str) -> int:
+        return len(self.encode(text))
+
+
+class NamedTokenizer(Tokenizer):
+    def __repr__(self) -> str:
+        return f"NamedTokenizer({self.name!r})"
+
+
+def count_tokens(text: str, tokenizer: Tokenizer = NamedTokenizer("default")) -> int:
+    return len(tokenizer.encode(text))
+
+
+def make_count_tokens(tokenizer: Tokenizer):
+    return lambda text: len(tokenizer.encode(text))
+
+
+def test_callable_identity_of_described_callables():
+    assert callable_identity(len) == callable_identity(len)
+    assert callable_identity(count_tokens) == callable_identity(count_tokens)
+    assert callable_identity(NamedTokenizer("a").count) != callable_identity(NamedTokenizer("b").count)
+    assert callable_identity(functools.partial(count_tokens, tokenizer=NamedTokenizer("a"))) != callable_identity(
+        functools.partial(count_tokens, tokenizer=NamedTokenizer("b"))
+    )
+
+
+def make_length_func(helper_source: str):
+    # a module of which length function calls a helper function
+    namespace = {"__name__": "length_funcs"}
+    exec(helper_source + "\n\ndef count(text):\n    return sum(helper(word) for word in text.split())\n", namespace)
+    return namespace["count"]
+
+
+def test_callable_identity_of_helper_functions():
+    words = make_length_func("def helper(word):\n    return 1")
+    chars = make_length_func("def helper(word):\n    return len(word)")
+    assert callable_identity(words) == callable_identity(make_length_func("def helper(word):\n    return 1"))
+    assert callable_identity(words) != callable_identity(chars)
+
+    recursive = make_length_func("def helper(word):\n    return 0 if word == '' else 1 + helper(word[1:])")
+    assert callable_identity(recursive) != callable_identity(chars)
+
+
+@pytest.mark.parametrize(
+    "length_func",
+    [
+        make_count_tokens(NamedTokenizer("a")),
+        Tokenizer("a").count,
+        functools.partial(count_tokens, tokenizer=Tokenizer("a")),
+    ],
+)
+def test_callable_identity_requires_explicit_id(length_func, tmp_path):
+    with pytest.raises(ValueError, match="length_func_id"):
+        callable_identity(length_func)
+
+    soup = BeautifulSoup("<p>Paragraph of the page.</p>", "lxml")
+    cache = DocumentCache(tmp_path)
+    with pytest.raises(ValueError, match="length_func_id"):
+        HTMLSplitter(soup, length_func=length_func, token_max=100, cache=cache)
+    splitter = HTMLSplitter(soup, length_func=length_func, token_max=100, cache=cache, length_func_id="a")
+    assert len(list(splitter.iter_documents())) == 1
@@ -0,0 +1,32 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from benchmarks.cleanser import make_table_page
+from benchmarks.generators import GENERATORS
+from splitter.cleanser import HTMLCleanser, LXMLCleanser
+
+CORPUS = {name: generator(scale=1) for name, generator in GENERATORS.items()}
+CORPUS["table_page"] = make_table_page(n_tables=5, n_rows=10)
+CORPUS["doctype"] = (
+    "<!DOCTYPE html>\n<html><head><title>Title</title></head><body>\n"
+    "  <p>Hello <b>world</b></p>\n\n  <table><tr><td> cell </td></tr></table>\n</body></html>"
+)
+
+CORPUS["empty"] = ""
+CORPUS["whitespace_only"] = "  \n\t "
+CORPUS["comment_only"] = "<!-- generated by the crawler -->"
+CORPUS["leading_comment"] = (
+    "<!-- generated by the crawler -->\n<html><body><table><tr><td>cell</td></tr></table></body></html><!-- end -->"
+)
+
+
+@pytest.mark.parametrize("name", list(CORPUS))
+def test_lxml_cleanser_gives_the_same_html(name):
+    html = CORPUS[name]
+    expected = str(HTMLCleanser().cleanse_html(BeautifulSoup(html, "lxml")))
+    # BeautifulSoup renders void tags as <br/>, lxml as <br>
+    expected = expected.replace("/>", ">")
+    cleanser = LXMLCleanser()
+    assert cleanser.cleanse_string(html) == expected
+    assert str(cleanser.cleanse_to_soup(html)) == expected
+    assert str(cleanser.cleanse_html(BeautifulSoup(html, "lxml"))) == expected
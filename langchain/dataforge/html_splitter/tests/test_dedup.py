@@ -0,0 +1,19 @@
+import pytest
+
+from splitter.dedup import ChunkDeduplicator
+
+
+def test_save_without_path():
+    deduplicator = ChunkDeduplicator()
+    with pytest.raises(ValueError, match="index_path"):
+        deduplicator.save()
+
+
+def test_save_and_load(tmp_path):
+    deduplicator = ChunkDeduplicator(index_path=tmp_path / "index.json")
+    content = "A paragraph repeated in the header of every page of the site."
+    assert deduplicator.check(content) is None
+    deduplicator.save()
+
+    loaded = ChunkDeduplicator(index_path=tmp_path / "index.json")
+    assert loaded.check(content) == "exact"
@@ -0,0 +1,44 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from splitter.splitter import HTMLSplitter
+
+# the first chunk overflows on its own, so that the first document is empty
+OVERFLOWING = "<div><span>" + "x" * 150 + "</span></div>"
+HTML = OVERFLOWING + "".join(f"<p>Paragraph {i} of the page.</p>" for i in range(10))
+
+
+def make_splitter(html: str, split_strategy: str) -> HTMLSplitter:
+    soup = BeautifulSoup(html, "lxml")
+    return HTMLSplitter(soup, length_func=len, token_max=100, raise_error=False, split_strategy=split_strategy)
+
+
+@pytest.mark.parametrize("split_strategy", ["trial", "greedy"])
+def test_resplit_with_empty_first_page(split_strategy):
+    previous = make_splitter(HTML, split_strategy).split()
+    assert previous.documents[0].page_content == ""
+    assert previous.boundaries[:2] == [0, 0]
+
+    new_html = "<p>Inserted.</p>" + HTML
+    update = make_splitter(new_html, split_strategy).resplit(previous)
+    assert update.result == make_splitter(new_html, split_strategy).split()
+
+
+@pytest.mark.parametrize("split_strategy", ["trial", "greedy"])
+def test_resplit_to_empty_first_page(split_strategy):
+    # removing the first paragraph makes the overflowing chunk first, and so an empty first document
+    previous_html = "<p>Intro.</p>" + HTML
+    previous = make_splitter(previous_html, split_strategy).split()
+    assert previous.documents[0].page_content != ""
+
+    update = make_splitter(HTML, split_strategy).resplit(previous)
+    assert update.result == make_splitter(HTML, split_strategy).split()
+    assert update.result.boundaries[:2] == [0, 0]
+
+
+@pytest.mark.parametrize("split_strategy", ["trial", "greedy"])
+def test_resplit_unchanged(split_strategy):
+    previous = make_splitter(HTML, split_strategy).split()
+    update = make_splitter(HTML, split_strategy).resplit(previous)
+    assert update.result == previous
+    assert update.added == [] and update.removed_ids == []
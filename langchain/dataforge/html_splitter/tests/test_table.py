@@ -0,0 +1,35 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from splitter.splitter import HTMLSplitter
+
+# two header rows, and a row with a nested table in its cell
+HTML = (
+    "<table><tr><th>Name</th><th>Value</th></tr><tr><th>Unit</th><th>Count</th></tr>"
+    "<tr><td>nested</td><td><table><tr><td>inner</td></tr></table></td></tr>"
+    + "".join(f"<tr><td>row {i}</td><td>{'x' * 30}</td></tr>" for i in range(8))
+    + "</table>"
+)
+
+
+@pytest.mark.parametrize("serialization", ["prettify", "compact"])
+@pytest.mark.parametrize("split_strategy", ["trial", "greedy"])
+def test_split_table_repeats_header_rows(split_strategy, serialization):
+    soup = BeautifulSoup(HTML, "lxml")
+    splitter = HTMLSplitter(
+        soup, length_func=len, token_max=400, split_strategy=split_strategy, serialization=serialization
+    )
+    documents = list(splitter.iter_documents())
+    assert len(documents) > 1
+
+    for document in documents:
+        table = BeautifulSoup(document.page_content, "lxml").find("table")
+        rows = [row for row in table.find_all("tr") if row.find_parent("table") is table]
+        assert [row.get_text(" ", strip=True) for row in rows[:2]] == ["Name Value", "Unit Count"]
+        assert all(len(row.find_all("th")) == 0 for row in rows[2:])
+
+    # the rows of the nested table stay in their cell, once
+    contents = "".join(document.page_content for document in documents)
+    assert contents.count("inner") == 1
+    nested = BeautifulSoup(contents, "lxml").find(string=lambda text: "inner" in text)
+    assert nested.find_parent("table").find_parent("td") is not None
@@ -0,0 +1,111 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from langchain.callbacks.manager import Callbacks
+
+from _chains.chains import IRChain
+
+
+@dataclass
+class BatchingStats:
+    n_requests: int = 0
+    """Number of the requests received."""
+    n_batches: int = 0
+    """Number of the batches run."""
+    n_full: int = 0
+    """Number of the batches run as soon as `max_batch_size` requests are collected."""
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.n_requests / self.n_batches if self.n_batches > 0 else 0.0
+
+
+class ChainBatcher(object):
+    """Micro-batch the concurrent requests of IRChain into a single `aapply`.
+
+    The requests are collected for up to `max_wait` seconds from the first one, or until
+    `max_batch_size` requests are collected. Then the batch runs once: one batched retrieval
+    and one `agenerate` of the llm, and each result is routed back to its caller.
+    It raises the throughput of the llm backends that generate a batch at once (e.g., the local llms).
+
+    The requests with different `stop` are batched separately, as the llm takes a single `stop`.
+    If a batch fails, all of its callers get the error.
+
+    Example:
+        .. code-block:: python
+
+            batcher = ChainBatcher(chain, max_batch_size=16, max_wait=0.01)
+
+            async def accept(websocket):
+                request = json.loads(await websocket.recv())
+                answer = await batcher.acall({"question": request["question"]})
+    """
+
+    def __init__(self, chain: IRChain, max_batch_size: int = 16, max_wait: float = 0.01, callbacks: Callbacks = None):
+        """
+        Args:
+            chain: chain to run the batches
+            max_batch_size: maximum number of the requests in a batch
+            max_wait: maximum seconds to wait for the batch to fill, from its first request
+            callbacks: callbacks of each batch run, as those of `aapply`
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size should be positive, got {max_batch_size}.")
+        self.chain = chain
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.callbacks = callbacks
+        self.stats = BatchingStats()
+        # requests waiting by `stop`, and the timers to run them
+        self._pending: Dict[Optional[Tuple[str, ...]], List[Tuple[Dict[str, Any], asyncio.Future]]] = {}
+        self._timers: Dict[Optional[Tuple[str, ...]], asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def acall(self, inputs: Union[Dict[str, Any], Any], return_only_outputs: bool = False) -> Dict[str, Any]:
+        """Run the chain on the inputs in a batch with the other concurrent requests, as `chain.acall` does."""
+        loop = asyncio.get_running_loop()
+        inputs = self.chain.prep_inputs(inputs)
+        stop = inputs.get("stop")
+        key = None if stop is None else tuple(stop)
+        future = loop.create_future()
+        self.stats.n_requests += 1
+
+        batch = self._pending.setdefault(key, [])
+        batch.append((inputs, future))
+        if len(batch) >= self.max_batch_size:
+            self.stats.n_full += 1
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+
+        outputs = await future
+        return self.chain.prep_outputs(inputs, outputs, return_only_outputs)
+
+    def _flush(self, key: Optional[Tuple[str, ...]]) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, [])
+        if len(batch) == 0:
+            return
+        self.stats.n_batches += 1
+        task = asyncio.ensure_future(self._run(batch))
+        # keep the reference, not to be garbage collected while running
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        # copy the inputs, as the chain puts the documents into them
+        input_list = [dict(inputs) for inputs, _ in batch]
+        try:
+            outputs_list = await self.chain.aapply(input_list, callbacks=self.callbacks)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), outputs in zip(batch, outputs_list):
+            # the callers cancelled meanwhile have no one to get the result
+            if not future.done():
+                future.set_result(outputs)
@@ -0,0 +1,340 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+# hits of IR, as `ir_model.search` returns
+Hits = List[Dict[str, Any]]
+
+
+@dataclass
+class QueryCacheInfo:
+    exact_hits: int = 0
+    """Number of the queries answered by the same normalized query."""
+    semantic_hits: int = 0
+    """Number of the queries answered by a similar query, above the threshold."""
+    disk_hits: int = 0
+    """Number of the exact hits loaded from the disk, stored by the other processes (or the previous runs)."""
+    misses: int = 0
+    """Number of the queries which need to search."""
+    size: int = 0
+    """Number of the entries in memory."""
+
+    @property
+    def hit_rate(self) -> float:
+        n_queries = self.exact_hits + self.semantic_hits + self.misses
+        return (self.exact_hits + self.semantic_hits) / n_queries if n_queries > 0 else 0.0
+
+
+@dataclass
+class _Entry:
+    query: str
+    top_k: int
+    hits: Hits
+    expires_at: float
+    vector: Optional[np.ndarray] = None
+
+
+def normalize_query(query: str) -> str:
+    """Normalize the query, so that the questions differing only in case, spacing and punctuation match."""
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", query.lower())).strip()
+
+
+def _to_json(value: Any) -> Any:
+    # numpy scalars (e.g., scores of the vector stores)
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class _VectorIndex(object):
+    """Rows of the normalized vectors by key, updated in place as the entries are set and removed.
+    The matrix grows by doubling its capacity, and a removed row is filled with the last one."""
+
+    def __init__(self):
+        self.keys: List[Tuple[int, str]] = []
+        self._rows: Dict[Tuple[int, str], int] = {}
+        self._matrix: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def put(self, key: Tuple[int, str], vector: np.ndarray) -> None:
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if self._matrix is None:
+                self._matrix = np.empty((16, len(vector)), dtype=np.float32)
+            elif row == len(self._matrix):
+                self._matrix = np.concatenate([self._matrix, np.empty_like(self._matrix)])
+            self.keys += [key]
+            self._rows[key] = row
+        self._matrix[row] = vector
+
+    def remove(self, key: Tuple[int, str]) -> None:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self.keys[row] = self.keys[last]
+            self._rows[self.keys[row]] = row
+        self.keys.pop()
+
+    def similarities(self, vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the vector with each row, in the order of `keys`."""
+        return self._matrix[: len(self.keys)] @ vector
+
+    def clear(self) -> None:
+        self.keys, self._rows, self._matrix = [], {}, None
+
+
+class QueryCache(object):
+    """Two-level cache of the IR results in front of `ir_model.search`.
+
+    - exact: LRU of the normalized queries, of which entries expire after `ttl` seconds.
+    - semantic (if `embeddings` is given): the hits of the most similar cached query
+    are reused if the cosine similarity of their embeddings is at least `threshold`.
+
+    If `path` is given, the entries are stored into the local sqlite database as well,
+    so that the worker processes sharing the path reuse the results of each other.
+
+    It is safe to share between the threads. The queries are embedded and the database is read
+    and written outside the lock of the in-memory entries, so that a lookup never waits for
+    the embedding or disk I/O of the other threads.
+
+    Example:
+        .. code-block:: python
+
+            from langchain.embeddings import OpenAIEmbeddings
+
+            cache = QueryCache(maxsize=10000, ttl=3600, embeddings=OpenAIEmbeddings(), path="ir_cache.sqlite")
+            retriever = IRRetriever(ir_model=ir_model, top_k=5, cache=cache)
+            docs = retriever.get_relevant_documents("YOUR QUESTION")
+            print(cache.cache_info().hit_rate)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: Optional[float] = 3600,
+        embeddings: Optional[Embeddings] = None,
+        threshold: float = 0.95,
+        path: Optional[Union[str, Path]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.path = None if path is None else Path(path)
+
+        self._entries: "OrderedDict[Tuple[int, str], _Entry]" = OrderedDict()
+        # embeddings of the recent queries, to embed a query once for both `get` and `put`
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # vectors of the entries with embeddings, updated as the entries are set and removed
+        self._index = _VectorIndex()
+        self._info = QueryCacheInfo()
+        # lock of the in-memory entries, vectors and metrics
+        self._lock = threading.RLock()
+        # lock of the database connection and `_last_rowid`, never held while waiting for `_lock`
+        self._db_lock = threading.Lock()
+
+        self._conn = None
+        # rowid of the last entry synced from the database
+        self._last_rowid = 0
+        if self.path is not None:
+            self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, query TEXT, top_k INTEGER, hits TEXT, vector BLOB, expires_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+            self._conn.commit()
+
+    @staticmethod
+    def _db_key(key: Tuple[int, str]) -> str:
+        return f"{key[0]}:{key[1]}"
+
+    def _expires_at(self) -> float:
+        return float("inf") if self.ttl is None else time.time() + self.ttl
+
+    def _embed(self, query: str) -> np.ndarray:
+        """Embed the query, outside the lock unless it has been embedded recently."""
+        with self._lock:
+            vector = self._vectors.get(query)
+            if vector is not None:
+                self._vectors.move_to_end(query)
+                return vector
+
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+        with self._lock:
+            self._vectors[query] = vector
+            if len(self._vectors) > 1024:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def _set(self, key: Tuple[int, str], entry: _Entry) -> None:
+        """Set the entry in memory. It must be called with the lock held."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if entry.vector is not None:
+            self._index.put(key, entry.vector)
+        else:
+            self._index.remove(key)
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            self._index.remove(evicted)
+
+    def _pop(self, key: Tuple[int, str]) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._index.remove(key)
+
+    def _load(self, row: tuple) -> Tuple[Tuple[int, str], _Entry]:
+        _, query, top_k, hits, vector, expires_at = row
+        vector = None if vector is None else np.frombuffer(vector, dtype=np.float32)
+        return (top_k, query), _Entry(
+            query=query, top_k=top_k, hits=json.loads(hits), expires_at=expires_at, vector=vector
+        )
+
+    def _sync(self) -> None:
+        """Load the entries stored into the database by the other processes since the last sync."""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT rowid, key, query, top_k, hits, vector, expires_at FROM entries "
+                "WHERE rowid > ? AND expires_at > ?",
+                (self._last_rowid, time.time()),
+            ).fetchall()
+            if len(rows) > 0:
+                self._last_rowid = max(self._last_rowid, max(row[0] for row in rows))
+        entries = [self._load(row[1:]) for row in rows]
+        with self._lock:
+            for key, entry in entries:
+                self._set(key, entry)
+
+    def _get_disk(self, key: Tuple[int, str]) -> Optional[_Entry]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT key, query, top_k, hits, vector, expires_at FROM entries WHERE key = ? AND expires_at > ?",
+                (self._db_key(key), time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        _, entry = self._load(row)
+        with self._lock:
+            self._set(key, entry)
+        return entry
+
+    def _get_similar(self, vector: np.ndarray, top_k: int) -> Optional[_Entry]:
+        """Most similar entry of the vector. It must be called with the lock held."""
+        if len(self._index) == 0:
+            return None
+
+        keys = self._index.keys
+        similarities = self._index.similarities(vector)
+        now = time.time()
+        # the most similar entry of the same top_k, skipping the expired ones
+        for i in np.argsort(-similarities):
+            if similarities[i] < self.threshold:
+                return None
+            entry = self._entries.get(keys[i])
+            if entry is not None and entry.top_k == top_k and entry.expires_at > now:
+                self._entries.move_to_end(keys[i])
+                return entry
+        return None
+
+    def get(self, query: str, top_k: int) -> Optional[Hits]:
+        """Get the cached hits of the query, or None if it needs to search.
+
+        Returns:
+            Copies of the cached hits, which the caller is free to modify
+        """
+        normalized = normalize_query(query)
+        key = (top_k, normalized)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.time():
+                self._pop(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._info.exact_hits += 1
+                return [dict(hit) for hit in entry.hits]
+
+        if self._conn is not None:
+            entry = self._get_disk(key)
+            if entry is not None:
+                with self._lock:
+                    self._info.exact_hits += 1
+                    self._info.disk_hits += 1
+                return [dict(hit) for hit in entry.hits]
+
+        if self.embeddings is not None:
+            if self._conn is not None:
+                self._sync()
+            vector = self._embed(normalized)
+            with self._lock:
+                entry = self._get_similar(vector, top_k)
+                if entry is not None:
+                    self._info.semantic_hits += 1
+                    return [dict(hit) for hit in entry.hits]
+
+        with self._lock:
+            self._info.misses += 1
+        return None
+
+    def put(self, query: str, top_k: int, hits: Hits) -> None:
+        """Cache the hits of the query, searched by `ir_model.search`."""
+        normalized = normalize_query(query)
+        key = (top_k, normalized)
+        vector = None if self.embeddings is None else self._embed(normalized)
+        entry = _Entry(
+            query=normalized,
+            top_k=top_k,
+            hits=[dict(hit) for hit in hits],
+            expires_at=self._expires_at(),
+            vector=vector,
+        )
+        with self._lock:
+            self._set(key, entry)
+        if self._conn is None:
+            return
+
+        with self._db_lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self._db_key(key),
+                    normalized,
+                    top_k,
+                    json.dumps(entry.hits, default=_to_json),
+                    None if vector is None else vector.tobytes(),
+                    entry.expires_at,
+                ),
+            )
+
+    def cache_info(self) -> QueryCacheInfo:
+        with self._lock:
+            return replace(self._info, size=len(self._entries))
+
+    def cache_clear(self) -> None:
+        """Remove all the entries, from the disk as well, and reset the metrics."""
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
+            self._index.clear()
+            self._info = QueryCacheInfo()
+        if self._conn is not None:
+            with self._db_lock, self._conn:
+                self._conn.execute("DELETE FROM entries")
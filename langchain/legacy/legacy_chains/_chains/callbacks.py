@@ -1,5 +1,8 @@
-from typing import Any
+import asyncio
+from dataclasses import dataclass
+from typing import Any, List, Literal, Optional
 from langchain.callbacks.base import AsyncCallbackHandler
+from langchain.schema import LLMResult
 
 
 class StreamingLLMCallbackHandler(AsyncCallbackHandler):
@@ -76,3 +79,178 @@ class StreamingLLMCallbackHandler(AsyncCallbackHandler):
 
     async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
         await self.websocket.send(token)
+
+
+@dataclass
+class StreamingStats:
+    n_tokens: int = 0
+    """Number of tokens generated by the llm."""
+    n_frames: int = 0
+    """Number of frames sent through the websocket."""
+    n_dropped: int = 0
+    """Number of tokens dropped, as the client fell behind (or disconnected)."""
+    disconnected: bool = False
+    """Whether the websocket is closed by the handler, or failed to send."""
+
+
+class BufferedStreamingCallbackHandler(AsyncCallbackHandler):
+    """Callback handler to stream the llm tokens through the websocket, without stalling the llm.
+
+    The tokens are put into a bounded queue of the connection, and a writer task sends them.
+    The writer coalesces the tokens into a frame until the frame has `max_frame_size` characters
+    or `flush_interval` seconds pass since its first token, so that a frame carries many tokens.
+
+    If the client falls behind so far that the queue is full, the handler applies the `policy`:
+
+    - 'drop': drop the new tokens until the queue has room again.
+    - 'disconnect': close the websocket, and drop all the tokens after.
+
+    The same `policy` applies when the client does not take the tokens left within `close_timeout`
+    seconds after the llm ends, so that a stalled client does not block the chain.
+
+    Example:
+        .. code-block:: python
+
+            async def accept(websocket):
+                request = json.loads(await websocket.recv())
+                handler = BufferedStreamingCallbackHandler(websocket, max_frame_size=64, flush_interval=0.05)
+                answer = await chain.acall({"question": request["question"]}, callbacks=[handler])
+                await handler.aclose()
+    """
+
+    def __init__(
+        self,
+        websocket,
+        max_queue_size: int = 1024,
+        max_frame_size: int = 64,
+        flush_interval: float = 0.05,
+        policy: Literal["drop", "disconnect"] = "drop",
+        close_timeout: Optional[float] = 10.0,
+    ):
+        self.websocket = websocket
+        self.max_queue_size = max_queue_size
+        self.max_frame_size = max_frame_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.close_timeout = close_timeout
+        self.stats = StreamingStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        # tokens of the frame being coalesced or sent by the writer
+        self._frame: List[str] = []
+
+    def _start(self) -> None:
+        if self._writer is None or self._writer.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._writer = asyncio.create_task(self._write())
+
+    async def _write(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            token = await self._queue.get()
+            if token is None:
+                return
+            frame = self._frame = [token]
+            size = len(token)
+            deadline = loop.time() + self.flush_interval
+            while size < self.max_frame_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        token = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    token = self._queue.get_nowait()
+                if token is None:
+                    closing = True
+                    break
+                frame.append(token)
+                size += len(token)
+
+            try:
+                await self.send_frame("".join(frame))
+            except Exception:
+                # the client is gone: drop the rest of the tokens
+                self.stats.disconnected = True
+                self.stats.n_dropped += len(frame)
+                self._frame = []
+                return
+            self._frame = []
+            self.stats.n_frames += 1
+
+    async def send_frame(self, text: str) -> None:
+        """Send a frame of the coalesced tokens through the websocket."""
+        await self.websocket.send(text)
+
+    def abort(self) -> None:
+        """Stop the writer, dropping the tokens of the frame being sent and the tokens left in the queue."""
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+            self.stats.n_dropped += len(self._frame)
+            self._frame = []
+            while not self._queue.empty():
+                # except for the end of the stream
+                if self._queue.get_nowait() is not None:
+                    self.stats.n_dropped += 1
+
+    async def _disconnect(self) -> None:
+        self.stats.disconnected = True
+        self.abort()
+        close = getattr(self.websocket, "close", None)
+        if close is not None:
+            try:
+                await close()
+            except Exception:
+                pass
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.stats.n_tokens += 1
+        if self.stats.disconnected:
+            self.stats.n_dropped += 1
+            return
+        self._start()
+        try:
+            self._queue.put_nowait(token)
+        except asyncio.QueueFull:
+            self.stats.n_dropped += 1
+            if self.policy == "disconnect":
+                await self._disconnect()
+
+    async def _expire(self) -> None:
+        if self.policy == "disconnect":
+            await self._disconnect()
+        else:
+            self.abort()
+
+    async def aclose(self) -> None:
+        """Send the tokens left in the queue, and wait for the writer to finish.
+        If it does not finish within `close_timeout` seconds, the rest is dropped (and the websocket is
+        closed, if the `policy` is 'disconnect')."""
+        if self._writer is None or self._writer.done():
+            return
+        loop = asyncio.get_running_loop()
+        deadline = None if self.close_timeout is None else loop.time() + self.close_timeout
+        # wait for the room of the end of the stream, unless the writer stops meanwhile
+        while self._queue.full():
+            if deadline is not None and loop.time() >= deadline:
+                await self._expire()
+                return
+            interval = self.flush_interval if deadline is None else min(self.flush_interval, deadline - loop.time())
+            await asyncio.sleep(interval)
+            if self._writer.done():
+                return
+        self._queue.put_nowait(None)
+        timeout = None if deadline is None else max(deadline - loop.time(), 0)
+        done, _ = await asyncio.wait([self._writer], timeout=timeout)
+        if len(done) == 0:
+            await self._expire()
+
+    async def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        await self.aclose()
+
+    async def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        await self.aclose()
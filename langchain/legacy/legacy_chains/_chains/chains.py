@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import inspect
-from typing import Any, List, Tuple
+from collections import OrderedDict
+from functools import partial
+from typing import Any, List, Optional, Tuple
 from langchain.callbacks.manager import CallbackManagerForChainRun, AsyncCallbackManagerForChainRun
 from langchain.chains import LLMChain
-from langchain.prompts.base import BasePromptTemplate
+from langchain.prompts.base import BasePromptTemplate, StringPromptValue
 from langchain.schema import (
     BaseLLMOutputParser,
     BaseRetriever,
@@ -16,7 +19,11 @@ from langchain.schema import (
 )
 from langchain.schema.language_model import BaseLanguageModel
 from langchain.utils.input import get_colored_text
-from pydantic import Extra, Field
+from pydantic import Extra, Field, PrivateAttr
+
+from _chains.packing import ContextPacker
+from _chains.retrievers import get_retrieval_executor
+from _chains.templates import CompiledTemplate
 
 
 class IRChain(LLMChain):
@@ -38,6 +45,28 @@ class IRChain(LLMChain):
     otherwise."""
     document_prompt_if_no_docs_found: str = ""
     """The document_prompt if no docs are found for the input question."""
+    max_concurrency: int = 8
+    """Maximum number of questions to retrieve the documents concurrently in `agenerate`."""
+    batch_retrieval: bool = False
+    """Whether to retrieve the documents of all the questions at once in `generate` (and `agenerate`),
+    by `get_relevant_documents_batch` (`aget_relevant_documents_batch`) of the retriever if any,
+    or in the shared thread pool (concurrently) otherwise.
+    Enable it only for a thread-safe retriever, e.g. ReentrantIRRetriever (IRRetriever keeps `retrieved_docs`)."""
+    compile_templates: bool = True
+    """Whether to parse `prompt` and `document_prompt` once, and format them without parsing again."""
+    doc_strings_cache_size: int = 4096
+    """Maximum number of the formatted documents to keep by their id (`document_id_key` of the metadata),
+    page content and metadata. Set 0 to format the documents every time."""
+    document_id_key: str = "id"
+    """Key of the document id in the metadata of the documents."""
+    context_packer: Optional[ContextPacker] = None
+    """Packer to pick the documents fitting in its token budget, by their scores. All the documents if None."""
+
+    _input_keys: Optional[Tuple[BasePromptTemplate, List[str]]] = PrivateAttr(default=None)
+    _compiled: Optional[Tuple[Any, ...]] = PrivateAttr(default=None)
+    _doc_strings: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    # document_prompt which the cached doc strings are formatted with
+    _doc_strings_prompt: Optional[BasePromptTemplate] = PrivateAttr(default=None)
 
     """Retrieve the relevant documents given the user question, organize and format the prompt at once.
     Internally it uses `BaseRetriever` (here typically means your IR) to get relevant documents,
@@ -94,9 +123,12 @@ class IRChain(LLMChain):
 
     @property
     def input_keys(self) -> List[str]:
-        """Exclude document_variable_name from the input_variables to avoid validation error."""
-        self.prompt = self.prompt.partial(**{self.document_variable_name: ""})
-        return self.prompt.input_variables
+        """Exclude document_variable_name from the input_variables to avoid validation error.
+        The partial prompt is made once, until the prompt is replaced."""
+        if self._input_keys is None or self._input_keys[0] is not self.prompt:
+            self.prompt = self.prompt.partial(**{self.document_variable_name: ""})
+            self._input_keys = (self.prompt, self.prompt.input_variables)
+        return self._input_keys[1]
 
     @property
     def output_keys(self) -> List[str]:
@@ -126,6 +158,19 @@ class IRChain(LLMChain):
         docs = await self.retriever.aget_relevant_documents(question, callbacks=run_manager.get_child())
         return docs
 
+    def _get_docs_batch(
+        self,
+        questions: List[str],
+        input_list: List[dict[str, Any]],
+        *,
+        run_manager: CallbackManagerForChainRun,
+    ) -> List[List[Document]]:
+        """Get relevant documents of all the questions at once."""
+        if hasattr(self.retriever, "get_relevant_documents_batch"):
+            return self.retriever.get_relevant_documents_batch(questions, callbacks=run_manager.get_child())
+        get_docs = partial(self._get_docs, run_manager=run_manager)
+        return list(get_retrieval_executor().map(get_docs, questions, input_list))
+
     def _call(
         self,
         inputs: dict[str, Any],
@@ -142,6 +187,50 @@ class IRChain(LLMChain):
         response = await self.agenerate([inputs], run_manager=run_manager)
         return self.create_outputs(response)[0]
 
+    def _get_compiled(self) -> Tuple[Optional[CompiledTemplate], Optional[CompiledTemplate]]:
+        """Compiled prompt and document_prompt, each compiled again once it is replaced."""
+        if not self.compile_templates:
+            return None, None
+        prompt, compiled_prompt, document_prompt, compiled_document = self._compiled or (None, None, None, None)
+        if prompt is not self.prompt:
+            prompt, compiled_prompt = self.prompt, CompiledTemplate.compile(self.prompt)
+        if document_prompt is not self.document_prompt:
+            document_prompt, compiled_document = self.document_prompt, CompiledTemplate.compile(self.document_prompt)
+        self._compiled = (prompt, compiled_prompt, document_prompt, compiled_document)
+        return compiled_prompt, compiled_document
+
+    def _format_document(self, doc: Document) -> str:
+        """Format the document, or get the one formatted before with the same id, page content and metadata."""
+        _, compiled = self._get_compiled()
+        if self._doc_strings_prompt is not self.document_prompt:
+            self._doc_strings.clear()
+            self._doc_strings_prompt = self.document_prompt
+
+        doc_id = doc.metadata.get(self.document_id_key) if self.doc_strings_cache_size > 0 else None
+        key = None
+        if isinstance(doc_id, (str, int)):
+            # passages of the same parent document, or a re-indexed document, may share the id
+            key = (doc_id, doc.page_content, repr(doc.metadata))
+            if key in self._doc_strings:
+                self._doc_strings.move_to_end(key)
+                return self._doc_strings[key]
+
+        if compiled is not None:
+            doc_string = compiled.format_document(doc)
+        else:
+            doc_string = format_document(doc, self.document_prompt)
+        if key is not None:
+            self._doc_strings[key] = doc_string
+            if len(self._doc_strings) > self.doc_strings_cache_size:
+                self._doc_strings.popitem(last=False)
+        return doc_string
+
+    def _format_prompt(self, inputs: dict[str, Any]) -> PromptValue:
+        compiled, _ = self._get_compiled()
+        if compiled is not None:
+            return StringPromptValue(text=compiled.format(**inputs))
+        return self.prompt.format_prompt(**inputs)
+
     def _get_inputs(self, docs: List[Document]) -> str:
         """Construct document_variable_name.
 
@@ -153,7 +242,10 @@ class IRChain(LLMChain):
         """
         # Format each document according to the prompt
         if len(docs) != 0:
-            doc_strings = [format_document(doc, self.document_prompt) for doc in docs]
+            doc_strings = [self._format_document(doc) for doc in docs]
+            if self.context_packer is not None:
+                doc_strings = self.context_packer.pack(docs, doc_strings, self.document_separator)
+        if len(docs) != 0 and len(doc_strings) != 0:
             doc_strings = self.document_separator.join(doc_strings)
         else:
             doc_strings = self.document_prompt_if_no_docs_found
@@ -183,7 +275,9 @@ class IRChain(LLMChain):
         questions = [inputs["question"] for inputs in input_list]
 
         accepts_run_manager = "run_manager" in inspect.signature(self._get_docs).parameters
-        if accepts_run_manager:
+        if self.batch_retrieval and len(input_list) > 1:
+            docs_list = self._get_docs_batch(questions, input_list, run_manager=_run_manager)
+        elif accepts_run_manager:
             docs_list = [
                 self._get_docs(question, inputs, run_manager=_run_manager)
                 for question, inputs in zip(questions, input_list)
@@ -214,14 +308,12 @@ class IRChain(LLMChain):
         _run_manager = run_manager or CallbackManagerForChainRun.get_noop_manager()
         questions = [inputs["question"] for inputs in input_list]
 
-        accepts_run_manager = "run_manager" in inspect.signature(self._get_docs).parameters
-        if accepts_run_manager:
-            docs_list = [
-                await self._aget_docs(question, inputs, run_manager=_run_manager)
-                for question, inputs in zip(questions, input_list)
-            ]
+        if self.batch_retrieval and len(input_list) > 1 and hasattr(self.retriever, "aget_relevant_documents_batch"):
+            docs_list = await self.retriever.aget_relevant_documents_batch(
+                questions, callbacks=_run_manager.get_child(), max_concurrency=self.max_concurrency
+            )
         else:
-            docs_list = [await self._aget_docs(question, inputs) for question, inputs in zip(questions, input_list)]
+            docs_list = await self._aget_docs_concurrently(questions, input_list, run_manager=_run_manager)
 
         doc_strings_list = [self._get_inputs(docs) for docs in docs_list]
 
@@ -238,6 +330,27 @@ class IRChain(LLMChain):
             **self.llm_kwargs,
         )
 
+    async def _aget_docs_concurrently(
+        self,
+        questions: List[str],
+        input_list: List[dict[str, Any]],
+        *,
+        run_manager: AsyncCallbackManagerForChainRun,
+    ) -> List[List[Document]]:
+        """Get relevant documents of the questions concurrently, at most max_concurrency at a time."""
+        accepts_run_manager = "run_manager" in inspect.signature(self._get_docs).parameters
+        semaphore = asyncio.Semaphore(max(self.max_concurrency, 1))
+
+        async def _aget_docs(question: str, inputs: dict[str, Any]) -> List[Document]:
+            async with semaphore:
+                if accepts_run_manager:
+                    return await self._aget_docs(question, inputs, run_manager=run_manager)
+                return await self._aget_docs(question, inputs)
+
+        return list(
+            await asyncio.gather(*[_aget_docs(question, inputs) for question, inputs in zip(questions, input_list)])
+        )
+
     def prep_prompts(
         self,
         input_list: List[dict[str, Any]],
@@ -254,10 +367,11 @@ class IRChain(LLMChain):
             inputs[self.document_variable_name] = doc_strings
             if self.memory is not None:
                 inputs[self.memory.memory_key] = self.memory.buffer_as_str
-            prompt = self.prompt.format_prompt(**inputs)
-            _colored_text = get_colored_text(prompt.to_string(), "green")
-            _text = "Prompt after formatting:\n" + _colored_text
-            if run_manager:
+            prompt = self._format_prompt(inputs)
+            # render the colored text only if any handler listens to it
+            if run_manager and len(run_manager.handlers) > 0:
+                _colored_text = get_colored_text(prompt.to_string(), "green")
+                _text = "Prompt after formatting:\n" + _colored_text
                 run_manager.on_text(_text, end="\n", verbose=self.verbose)
             if "stop" in inputs and inputs["stop"] != stop:
                 raise ValueError("If `stop` is present in any inputs, should be present in all.")
@@ -280,11 +394,12 @@ class IRChain(LLMChain):
             inputs[self.document_variable_name] = doc_strings
             if self.memory is not None:
                 inputs[self.memory.memory_key] = self.memory.buffer_as_str
-            prompt = self.prompt.format_prompt(**inputs)
-            _colored_text = get_colored_text(prompt.to_string(), "green")
-            _text = "Prompt after formatting:\n" + _colored_text
-            if run_manager:
-                run_manager.on_text(_text, end="\n", verbose=self.verbose)
+            prompt = self._format_prompt(inputs)
+            # render the colored text only if any handler listens to it
+            if run_manager and len(run_manager.handlers) > 0:
+                _colored_text = get_colored_text(prompt.to_string(), "green")
+                _text = "Prompt after formatting:\n" + _colored_text
+                await run_manager.on_text(_text, end="\n", verbose=self.verbose)
             if "stop" in inputs and inputs["stop"] != stop:
                 raise ValueError("If `stop` is present in any inputs, should be present in all.")
             prompts.append(prompt)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from typing import Callable, List, Optional, Set
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+
+
+class ContextPacker(object):
+    """Pack the retrieved documents into the context under a token budget.
+
+    The documents are ordered by the retrieval score (`score_key` of the metadata, in the
+    retrieval order if missing), or by MMR if `mmr_lambda` is given, to trade the score off
+    against the similarity to the documents already picked. Then they are packed greedily:
+    each document is added if it fits in the budget with the separators, and skipped otherwise.
+
+    The token count of each formatted document is cached, so that the documents retrieved
+    again are never measured twice.
+
+    Example:
+        .. code-block:: python
+
+            import tiktoken
+
+            encoding = tiktoken.get_encoding("cl100k_base")
+            packer = ContextPacker(length_func=lambda text: len(encoding.encode(text)), token_budget=3000)
+            chain = IRChain(..., context_packer=packer)
+    """
+
+    def __init__(
+        self,
+        length_func: Callable[[str], int],
+        token_budget: int,
+        score_key: str = "score",
+        mmr_lambda: Optional[float] = None,
+        embeddings: Optional[Embeddings] = None,
+        cache_size: int = 4096,
+    ):
+        """
+        Args:
+            length_func: function to count the tokens of a text (e.g., of the tokenizer of the llm)
+            token_budget: maximum number of tokens of the context, including the separators
+            score_key: key of the retrieval score in the metadata of the documents, higher is better
+            mmr_lambda: weight of the score against the diversity in MMR (1.0 to the score only), None not to use MMR
+            embeddings: embeddings to measure the similarity of the documents in MMR.
+                If None, the jaccard similarity of their words is used.
+            cache_size: maximum number of the token counts (and embeddings) to keep
+        """
+        if mmr_lambda is not None and not 0.0 <= mmr_lambda <= 1.0:
+            raise ValueError(f"mmr_lambda should be between 0 and 1, got {mmr_lambda}.")
+        self.length_func = length_func
+        self.token_budget = token_budget
+        self.score_key = score_key
+        self.mmr_lambda = mmr_lambda
+        self.embeddings = embeddings
+        self.cache_size = cache_size
+        self._lengths: "OrderedDict[str, int]" = OrderedDict()
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def _cache(self, cache: OrderedDict, key: str, value) -> None:
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def count(self, text: str) -> int:
+        """Count the tokens of the text, measuring it only at the first time."""
+        length = self._lengths.get(text)
+        if length is None:
+            length = self.length_func(text)
+            self._cache(self._lengths, text, length)
+        else:
+            self._lengths.move_to_end(text)
+        return length
+
+    def _scores(self, docs: List[Document]) -> List[float]:
+        scores = []
+        for doc in docs:
+            score = doc.metadata.get(self.score_key)
+            # the documents without the score are kept in the retrieval order, after the scored ones
+            scores += [float(score) if isinstance(score, (int, float)) else float("-inf")]
+        return scores
+
+    def _similarity_matrix(self, docs: List[Document]) -> np.ndarray:
+        if self.embeddings is not None:
+            missing = [doc.page_content for doc in docs if doc.page_content not in self._vectors]
+            if len(missing) > 0:
+                for text, vector in zip(missing, self.embeddings.embed_documents(missing)):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    self._cache(self._vectors, text, vector / max(float(np.linalg.norm(vector)), 1e-12))
+            vectors = np.stack([self._vectors[doc.page_content] for doc in docs])
+            return vectors @ vectors.T
+
+        words: List[Set[str]] = [set(re.findall(r"\w+", doc.page_content.lower())) for doc in docs]
+        matrix = np.eye(len(docs), dtype=np.float32)
+        for i in range(len(docs)):
+            for j in range(i + 1, len(docs)):
+                union = len(words[i] | words[j])
+                matrix[i, j] = matrix[j, i] = len(words[i] & words[j]) / union if union > 0 else 0.0
+        return matrix
+
+    def order(self, docs: List[Document]) -> List[int]:
+        """Order the documents to pack, as their positions."""
+        scores = self._scores(docs)
+        by_score = sorted(range(len(docs)), key=lambda i: -scores[i])
+        if self.mmr_lambda is None or len(docs) <= 2:
+            return by_score
+
+        # scores normalized into [0, 1] to be comparable to the similarities, or the ranks if no scores
+        finite = [score for score in scores if score != float("-inf")]
+        low, high = (min(finite), max(finite)) if len(finite) > 0 else (0.0, 0.0)
+        ranks = {i: rank for rank, i in enumerate(by_score)}
+        relevance = [
+            (scores[i] - low) / (high - low)
+            if high > low and scores[i] != float("-inf")
+            else 1.0 - ranks[i] / len(docs)
+            for i in range(len(docs))
+        ]
+        similarity = self._similarity_matrix(docs)
+
+        ordered = [by_score[0]]
+        remaining = by_score[1:]
+        while len(remaining) > 0:
+            best = max(
+                remaining,
+                key=lambda i: self.mmr_lambda * relevance[i]
+                - (1 - self.mmr_lambda) * max(similarity[i, j] for j in ordered),
+            )
+            ordered += [best]
+            remaining.remove(best)
+        return ordered
+
+    def pack(self, docs: List[Document], doc_strings: List[str], separator: str) -> List[str]:
+        """Pick the formatted documents to fit in the token budget.
+
+        Args:
+            docs: retrieved documents
+            doc_strings: formatted string of each document
+            separator: separator to join the formatted documents with
+
+        Returns:
+            Formatted documents picked, in the packed order
+        """
+        separator_length = self.count(separator) if len(separator) > 0 else 0
+        packed, total = [], 0
+        for i in self.order(docs):
+            length = self.count(doc_strings[i]) + (separator_length if len(packed) > 0 else 0)
+            if total + length <= self.token_budget:
+                packed += [doc_strings[i]]
+                total += length
+        return packed
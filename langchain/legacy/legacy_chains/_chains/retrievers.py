@@ -1,10 +1,21 @@
 import asyncio
+import threading
 import warnings
 import logging
-from typing import Any, List, Literal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Literal, Optional
 from functools import partial
+from langchain.load.dump import dumpd
 from langchain.schema import BaseRetriever, Document
-from langchain.callbacks.manager import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from langchain.callbacks.manager import (
+    CallbackManager,
+    CallbackManagerForRetrieverRun,
+    AsyncCallbackManagerForRetrieverRun,
+    Callbacks,
+)
+from pydantic import PrivateAttr
+
+from _chains.cache import QueryCache
 
 logging = logging.getLogger(__name__)
 warnings.filterwarnings("ignore")
@@ -12,23 +23,90 @@ warnings.filterwarnings("ignore")
 # IR DB only allows two types: 'local' and 'es'
 IR_DB_TYPE = Literal["local", "es"]
 
+# Maximum number of the threads retrieving the documents at once, shared by all the chains in the process
+RETRIEVAL_MAX_WORKERS = 8
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_retrieval_executor() -> ThreadPoolExecutor:
+    """Get the thread pool shared to retrieve the documents, creating it at the first call."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RETRIEVAL_MAX_WORKERS, thread_name_prefix="retrieval")
+        return _executor
+
 
 class IRRetriever(BaseRetriever):
     """IRRetriever(LangChain interface) to retrieve documents using IR."""
 
     ir_model: Any
-    """IR vectorizer"""
+    """IR vectorizer, which has `search(query, top_k)` returning the hits as dicts with `context`.
+    It may have `search_batch(queries, top_k)` and `async asearch(query, top_k)` as well."""
     top_k: int = 5
     """Number of documents to return"""
     """Search arguments of IR"""
     retrieved_docs: List[Document] = []
     """Retrieved documents from IR"""
+    cache: Optional[QueryCache] = None
+    """Cache of the IR results of the exact and similar queries, to skip the search"""
 
     class Config:
         """Configuration for this pydantic object"""
 
         arbitrary_types_allowed = True
 
+    @staticmethod
+    def _to_documents(docs: List[Dict[str, Any]]) -> List[Document]:
+        documents = []
+        for doc in docs:
+            context = doc.pop("context")
+            documents += [Document(page_content=context, metadata=doc, type="IR Document")]
+        return documents
+
+    def _keep_retrieved_docs(self, documents: List[Document]) -> None:
+        self.retrieved_docs = documents
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Executor to run the blocking searches in, bounded not to fill the default executor of the event loop."""
+        return get_retrieval_executor()
+
+    def _search(self, query: str) -> List[Dict[str, Any]]:
+        if self.cache is None:
+            return self.ir_model.search(query, top_k=self.top_k)
+        docs = self.cache.get(query, self.top_k)
+        if docs is None:
+            docs = self.ir_model.search(query, top_k=self.top_k)
+            self.cache.put(query, self.top_k, docs)
+        return docs
+
+    async def _asearch(self, query: str) -> List[Dict[str, Any]]:
+        if self.cache is None:
+            return await self.ir_model.asearch(query, top_k=self.top_k)
+        # the cache embeds the query and reads the disk, so that it runs off the event loop
+        loop = asyncio.get_running_loop()
+        docs = await loop.run_in_executor(self._get_executor(), self.cache.get, query, self.top_k)
+        if docs is None:
+            docs = await self.ir_model.asearch(query, top_k=self.top_k)
+            await loop.run_in_executor(self._get_executor(), self.cache.put, query, self.top_k, docs)
+        return docs
+
+    def _search_batch(self, queries: List[str]) -> List[List[Dict[str, Any]]]:
+        docs_list = [None if self.cache is None else self.cache.get(query, self.top_k) for query in queries]
+        misses = [i for i, docs in enumerate(docs_list) if docs is None]
+        if len(misses) == 0:
+            return docs_list
+
+        searched = self.ir_model.search_batch([queries[i] for i in misses], top_k=self.top_k)
+        if len(searched) != len(misses):
+            raise ValueError(f"search_batch returned {len(searched)} results for {len(misses)} queries.")
+        for i, docs in zip(misses, searched):
+            if self.cache is not None:
+                self.cache.put(queries[i], self.top_k, docs)
+            docs_list[i] = docs
+        return docs_list
+
     def _get_relevant_documents(
         self, query: str, *, run_manager: CallbackManagerForRetrieverRun = None
     ) -> List[Document]:
@@ -40,24 +118,140 @@ class IRRetriever(BaseRetriever):
             List of relevant documents
         """
 
-        docs = self.ir_model.search(query, top_k=self.top_k)
+        docs = self._search(query)
 
-        self.retrieved_docs = []
-        for i, doc in enumerate(docs, start=1):
-            context = doc.pop("context")
-            self.retrieved_docs += [Document(page_content=context, metadata=doc, type="IR Document")]
-        return self.retrieved_docs
+        documents = self._to_documents(docs)
+        self._keep_retrieved_docs(documents)
+        return documents
 
     async def _aget_relevant_documents(
         self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun = None
     ) -> List[Document]:
         """Asynchronously get documents relevant to a query.
+
+        If the IR model has `async asearch(query, top_k)` (e.g., backed by an aiohttp client
+        with pooled connections), it is awaited directly on the event loop, while the lookup and store
+        of the `cache` (if set) run in the bounded executor of the retriever. Otherwise, the blocking
+        `search` runs in the bounded executor of the retriever.
+
         Args:
             query: String to find relevant documents for
             run_manager: The callbacks handler to use
         Returns:
             List of relevant documents
         """
+        if hasattr(self.ir_model, "asearch"):
+            documents = self._to_documents(await self._asearch(query))
+            self._keep_retrieved_docs(documents)
+            return documents
         return await asyncio.get_running_loop().run_in_executor(
-            None, partial(self._get_relevant_documents, run_manager=run_manager), query
+            self._get_executor(), partial(self._get_relevant_documents, run_manager=run_manager), query
         )
+
+    def get_relevant_documents_batch(self, queries: List[str], *, callbacks: Callbacks = None) -> List[List[Document]]:
+        """Get documents relevant to each query at once.
+
+        If the IR model has `search_batch(queries, top_k)` (e.g., multi-search of Elasticsearch),
+        all the queries (except for the cached ones, if `cache` is set) are answered in a single round trip.
+        Otherwise, `search` is called for each query in the executor of the retriever.
+
+        Args:
+            queries: Strings to find relevant documents for
+            callbacks: Callback manager or list of callbacks
+        Returns:
+            List of relevant documents of each query, in the order of the queries
+        """
+        if len(queries) == 0:
+            return []
+        if not hasattr(self.ir_model, "search_batch"):
+            retrieve = partial(self.get_relevant_documents, callbacks=callbacks)
+            return list(self._get_executor().map(retrieve, queries))
+
+        callback_manager = CallbackManager.configure(
+            callbacks, None, local_tags=self.tags, local_metadata=self.metadata
+        )
+        run_managers = [callback_manager.on_retriever_start(dumpd(self), query) for query in queries]
+        try:
+            docs_list = self._search_batch(queries)
+        except Exception as e:
+            for run_manager in run_managers:
+                run_manager.on_retriever_error(e)
+            raise e
+
+        documents_list = [self._to_documents(docs) for docs in docs_list]
+        for run_manager, documents in zip(run_managers, documents_list):
+            run_manager.on_retriever_end(documents)
+        self._keep_retrieved_docs(documents_list[-1])
+        return documents_list
+
+    async def aget_relevant_documents_batch(
+        self, queries: List[str], *, callbacks: Callbacks = None, max_concurrency: Optional[int] = None
+    ) -> List[List[Document]]:
+        """Asynchronously get documents relevant to each query at once.
+
+        If the IR model has `search_batch(queries, top_k)`, it is called once in the executor
+        of the retriever. Otherwise, the queries are retrieved concurrently as `aget_relevant_documents`
+        does, at most `max_concurrency` at a time (if given).
+
+        Args:
+            queries: Strings to find relevant documents for
+            callbacks: Callback manager or list of callbacks
+            max_concurrency: Maximum number of the queries to retrieve at once, without `search_batch`
+        Returns:
+            List of relevant documents of each query, in the order of the queries
+        """
+        if hasattr(self.ir_model, "search_batch"):
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), partial(self.get_relevant_documents_batch, queries, callbacks=callbacks)
+            )
+
+        semaphore = asyncio.Semaphore(max(max_concurrency or len(queries), 1))
+
+        async def _aget_relevant_documents(query: str) -> List[Document]:
+            async with semaphore:
+                return await self.aget_relevant_documents(query, callbacks=callbacks)
+
+        return list(await asyncio.gather(*[_aget_relevant_documents(query) for query in queries]))
+
+
+class ReentrantIRRetriever(IRRetriever):
+    """IRRetriever which is safe to call concurrently, for the high-concurrency async serving.
+
+    - It keeps no state of the results: `retrieved_docs` is never written.
+    - The hits of IR are wrapped into the documents as they are, neither copied nor modified,
+    so that the metadata of each document is the hit itself (including `context`).
+    - The blocking searches (if the IR model has no `asearch`) run in its own executor of
+    `max_workers` threads, rather than in the thread pool shared by all the retrievers.
+
+    Example:
+        .. code-block:: python
+
+            retriever = ReentrantIRRetriever(ir_model=ir_model, top_k=5, max_workers=64)
+            docs_list = await asyncio.gather(*[retriever.aget_relevant_documents(q) for q in questions])
+            retriever.shutdown()
+    """
+
+    max_workers: int = 32
+    """Number of the threads to run the blocking searches"""
+    _executor: Optional[ThreadPoolExecutor] = PrivateAttr(default=None)
+    _executor_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @staticmethod
+    def _to_documents(docs: List[Dict[str, Any]]) -> List[Document]:
+        return [Document(page_content=doc["context"], metadata=doc, type="IR Document") for doc in docs]
+
+    def _keep_retrieved_docs(self, documents: List[Document]) -> None:
+        pass
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ir-retriever")
+            return self._executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the executor; it is created again at the next search."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -0,0 +1,239 @@
+import asyncio
+import itertools
+import json
+import logging
+import math
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from _chains.callbacks import BufferedStreamingCallbackHandler
+from _chains.chains import IRChain
+
+logging = logging.getLogger(__name__)
+
+
+class LatencyHistogram(object):
+    """Histogram of the latencies, of which buckets grow by sqrt(2) from 1 ms to about 90 s."""
+
+    def __init__(self, bounds: Optional[List[float]] = None):
+        # upper bound (in seconds) of each bucket, and the last bucket is unbounded
+        self.bounds = bounds or [0.001 * 2 ** (i / 2) for i in range(34)]
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket of the q-th percentile (0 < q <= 100), at most the maximum observed."""
+        if self.count == 0:
+            return 0.0
+        rank = math.ceil(self.count * q / 100)
+        for i, count in enumerate(itertools.accumulate(self.counts)):
+            if count >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count > 0 else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+@dataclass
+class ServerStats:
+    n_sessions: int = 0
+    """Number of the sessions connected now."""
+    n_requests: int = 0
+    """Number of the questions received."""
+    n_completed: int = 0
+    """Number of the questions answered."""
+    n_cancelled: int = 0
+    """Number of the questions cancelled, as the client disconnected before the answer."""
+    n_rejected: int = 0
+    """Number of the questions rejected, as the queue of the session was full."""
+    n_errors: int = 0
+    """Number of the questions failed."""
+    in_flight: int = 0
+    """Number of the questions being answered now."""
+    max_in_flight: int = 0
+    """Maximum number of the questions answered at once."""
+    ttft: LatencyHistogram = field(default_factory=LatencyHistogram)
+    """Time to the first token sent, from the question received."""
+    total: LatencyHistogram = field(default_factory=LatencyHistogram)
+    """Time to the answer sent, from the question received."""
+
+
+class _SessionStreamingHandler(BufferedStreamingCallbackHandler):
+    """Streaming handler of a question, which sends the frames as json messages with the question id."""
+
+    def __init__(self, websocket, request_id: Any, on_first_frame: Callable[[], None], **kwargs: Any):
+        super().__init__(websocket, **kwargs)
+        self.request_id = request_id
+        self.on_first_frame = on_first_frame
+
+    async def send_frame(self, text: str) -> None:
+        if self.on_first_frame is not None:
+            self.on_first_frame()
+            self.on_first_frame = None
+        await self.websocket.send(json.dumps({"type": "stream", "id": self.request_id, "text": text}))
+
+
+class ChainServer(object):
+    """Serve IRChain to many websocket sessions at once.
+
+    The sessions share the chains (in round-robin), so that the chains should have no memory.
+    Each session has its own queue of the questions, answered one after another in the order
+    received; the questions beyond `max_session_queue` are rejected. At most `max_in_flight`
+    questions are answered at once over all the sessions. If a client disconnects, the question
+    being answered is cancelled, and the questions queued are dropped.
+
+    Protocol (json messages):
+        - client: {"question": "...", "id": optional id of the question}
+        - server: {"type": "stream", "id": id, "text": tokens coalesced}, ...,
+          then {"type": "end", "id": id, "answer": "..."} or {"type": "error", "id": id, "error": "..."}
+
+    Example:
+        .. code-block:: python
+
+            chains = [load_ir_chain(llm=llm, retriever=retriever, prompt=prompt, ...) for _ in range(4)]
+            server = ChainServer(chains, max_in_flight=32)
+            asyncio.run(server.serve("0.0.0.0", 8000))
+    """
+
+    def __init__(
+        self,
+        chains: Union[IRChain, List[IRChain]],
+        max_in_flight: int = 32,
+        max_session_queue: int = 8,
+        streaming_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            chains: chains to share among the sessions
+            max_in_flight: maximum number of the questions answered at once
+            max_session_queue: maximum number of the questions queued in a session
+            streaming_kwargs: arguments of `BufferedStreamingCallbackHandler` (e.g., max_frame_size, flush_interval)
+        """
+        self.chains = chains if isinstance(chains, list) else [chains]
+        self.max_in_flight = max_in_flight
+        self.max_session_queue = max_session_queue
+        self.streaming_kwargs = streaming_kwargs or {}
+        self.stats = ServerStats()
+        self._chains = itertools.cycle(self.chains)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._request_ids = itertools.count()
+
+    async def _send(self, websocket, message: Dict[str, Any]) -> None:
+        try:
+            await websocket.send(json.dumps(message))
+        except Exception:
+            # the client is gone, which the session finds out by itself
+            pass
+
+    async def _answer(self, websocket, request: Dict[str, Any], received_at: float) -> None:
+        loop = asyncio.get_running_loop()
+        request_id = request.get("id", next(self._request_ids))
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        handler: Optional[_SessionStreamingHandler] = None
+        try:
+            # a question cancelled while waiting for the room is cancelled as well
+            async with self._semaphore:
+                self.stats.in_flight += 1
+                self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+                try:
+                    chain = next(self._chains)
+                    handler = _SessionStreamingHandler(
+                        websocket,
+                        request_id,
+                        on_first_frame=lambda: self.stats.ttft.observe(loop.time() - received_at),
+                        **self.streaming_kwargs,
+                    )
+                    outputs = await chain.acall({"question": request["question"]}, callbacks=[handler])
+                    await handler.aclose()
+                    message = json.dumps({"type": "end", "id": request_id, "answer": outputs[chain.output_key]})
+                finally:
+                    self.stats.in_flight -= 1
+        except asyncio.CancelledError:
+            if handler is not None:
+                handler.abort()
+            self.stats.n_cancelled += 1
+            raise
+        except Exception as e:
+            if handler is not None:
+                handler.abort()
+            self.stats.n_errors += 1
+            logging.warning(f"Failed to answer the question {request_id}: {e}")
+            await self._send(websocket, {"type": "error", "id": request_id, "error": str(e)})
+            return
+
+        try:
+            await websocket.send(message)
+        except Exception:
+            # the client disconnected before the answer
+            self.stats.n_cancelled += 1
+            return
+        self.stats.n_completed += 1
+        self.stats.total.observe(loop.time() - received_at)
+
+    async def _work(self, websocket, queue: asyncio.Queue) -> None:
+        while True:
+            request, received_at = await queue.get()
+            await self._answer(websocket, request, received_at)
+
+    async def handle(self, websocket, path: Optional[str] = None) -> None:
+        """Handle a websocket session until the client disconnects.
+        `path` is given by the old versions of `websockets.serve`, and ignored."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_session_queue)
+        worker = asyncio.create_task(self._work(websocket, queue))
+        self.stats.n_sessions += 1
+        try:
+            async for message in websocket:
+                try:
+                    request = json.loads(message)
+                    if not isinstance(request, dict) or not isinstance(request.get("question"), str):
+                        raise ValueError("The message should be a json object with the question.")
+                except ValueError as e:
+                    await self._send(websocket, {"type": "error", "id": None, "error": str(e)})
+                    continue
+
+                self.stats.n_requests += 1
+                try:
+                    queue.put_nowait((request, loop.time()))
+                except asyncio.QueueFull:
+                    self.stats.n_rejected += 1
+                    await self._send(websocket, {"type": "error", "id": request.get("id"), "error": "busy"})
+        except Exception as e:
+            # closed abnormally (e.g., ConnectionClosedError of websockets)
+            logging.info(f"Session closed: {e}")
+        finally:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+            self.stats.n_cancelled += queue.qsize()
+            self.stats.n_sessions -= 1
+
+    async def serve(self, host: str = "0.0.0.0", port: int = 8000) -> None:
+        """Serve the websocket sessions on the host and port, until cancelled."""
+        try:
+            import websockets
+        except ImportError as e:
+            raise ImportError(
+                "Could not import websockets python package. Please install it with `pip install websockets`."
+            ) from e
+
+        async with websockets.serve(self.handle, host, port):
+            await asyncio.Future()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.prompts import PromptTemplate
+from langchain.prompts.base import BasePromptTemplate
+from langchain.schema import Document
+
+
+class CompiledTemplate(object):
+    """f-string PromptTemplate parsed once into its literals and variables.
+
+    Formatting it is a single join, instead of parsing the template again on every call.
+    It keeps the strictness of the template: the variables missing or not used raise KeyError.
+
+    Example:
+        .. code-block:: python
+
+            compiled = CompiledTemplate.compile(PromptTemplate.from_template("Title {title}\\n{page_content}"))
+            compiled.format(title="foo", page_content="bar")
+    """
+
+    def __init__(self, slots: List[Tuple[str, Optional[str]]], prompt: PromptTemplate):
+        self.slots = slots
+        """(literal, name of the variable after it) of the template in order."""
+        self.prompt = prompt
+        """Template compiled."""
+        self.names = {name for _, name in slots if name is not None}
+
+    @classmethod
+    def compile(cls, prompt: BasePromptTemplate) -> Optional[CompiledTemplate]:
+        """Compile the prompt, or None if it is not a plain f-string PromptTemplate
+        (e.g., a chat prompt, jinja2 or the variables with the format spec, conversion or attribute)."""
+        if not isinstance(prompt, PromptTemplate) or prompt.template_format != "f-string":
+            return None
+        slots = []
+        try:
+            for literal, name, format_spec, conversion in Formatter().parse(prompt.template):
+                if name is not None and (name == "" or name.isdigit() or format_spec or conversion):
+                    return None
+                if name is not None and any(char in name for char in ".["):
+                    return None
+                slots += [(literal, name)]
+        except ValueError:
+            return None
+        return cls(slots, prompt)
+
+    def _merge(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if len(self.prompt.partial_variables) == 0:
+            return kwargs
+        return self.prompt._merge_partial_and_user_variables(**kwargs)
+
+    def format(self, **kwargs: Any) -> str:
+        kwargs = self._merge(kwargs)
+        extra = set(kwargs).difference(self.names)
+        if extra:
+            raise KeyError(extra)
+        parts = []
+        for literal, name in self.slots:
+            parts.append(literal)
+            if name is not None:
+                parts.append(format(kwargs[name], ""))
+        return "".join(parts)
+
+    def format_document(self, doc: Document) -> str:
+        """Format the document as `format_document` does."""
+        input_variables = self.prompt.input_variables
+        base_info = {"page_content": doc.page_content, **doc.metadata}
+        missing_metadata = set(input_variables).difference(base_info)
+        if len(missing_metadata) > 0:
+            required_metadata = [iv for iv in input_variables if iv != "page_content"]
+            raise ValueError(
+                f"Document prompt requires documents to have metadata variables: "
+                f"{required_metadata}. Received document with missing metadata: "
+                f"{list(missing_metadata)}."
+            )
+        return self.format(**{k: base_info[k] for k in input_variables})
@@ -0,0 +1,42 @@
+"""Benchmark the latency of IRChain.agenerate over a batch of questions,
+with a stub retriever sleeping `--latency` seconds per question.
+
+Run it inside the legacy_chains directory:
+
+    python -m benchmarks.agenerate_latency --n_questions 1 8 32 --max_concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.stubs import SleepingRetriever, make_chain
+
+
+async def measure(n_questions: int, max_concurrency: int, latency: float) -> float:
+    chain = make_chain(SleepingRetriever(latency=latency), max_concurrency=max_concurrency)
+    input_list = [{"question": f"question {i}"} for i in range(n_questions)]
+    start = time.perf_counter()
+    await chain.agenerate(input_list)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n_questions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max_concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{'questions':>9} {'concurrency':>11} {'elapsed(s)':>10} {'sequential(s)':>13} {'speedup':>8}")
+    for n_questions in args.n_questions:
+        sequential = n_questions * args.latency
+        for max_concurrency in args.max_concurrency:
+            elapsed = asyncio.run(measure(n_questions, max_concurrency, args.latency))
+            print(
+                f"{n_questions:>9} {max_concurrency:>11} {elapsed:>10.3f} {sequential:>13.3f} "
+                f"{sequential / elapsed:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Benchmark the latency of the synchronous IRChain.generate over a batch of questions,
+with a stub IR model sleeping `--latency` seconds per search (or per `search_batch`).
+
+Modes:
+    - sequential: one question after another (batch_retrieval=False)
+    - thread_pool: `search` of each question in the shared thread pool
+    - search_batch: all the questions in a single `search_batch`
+
+Run it inside the legacy_chains directory:
+
+    python -m benchmarks.generate_latency --n_questions 1 8 32
+"""
+import argparse
+import time
+
+from _chains.retrievers import IRRetriever
+from benchmarks.stubs import SleepingBatchIRModel, SleepingIRModel, make_chain
+
+MODES = ["sequential", "thread_pool", "search_batch"]
+
+
+def measure(mode: str, n_questions: int, latency: float) -> float:
+    ir_model = SleepingBatchIRModel(latency=latency) if mode == "search_batch" else SleepingIRModel(latency=latency)
+    chain = make_chain(IRRetriever(ir_model=ir_model, top_k=5), batch_retrieval=mode != "sequential")
+    input_list = [{"question": f"question {i}"} for i in range(n_questions)]
+    start = time.perf_counter()
+    chain.generate(input_list)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n_questions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{'questions':>9} {'mode':>12} {'elapsed(s)':>10} {'speedup':>8}")
+    for n_questions in args.n_questions:
+        sequential = n_questions * args.latency
+        for mode in args.modes:
+            elapsed = measure(mode, n_questions, args.latency)
+            print(f"{n_questions:>9} {mode:>12} {elapsed:>10.3f} {sequential / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark ChainBatcher against calling IRChain.acall for each request.
+
+The requests arrive at `--arrival_rate` per second (poisson), and each is answered by
+a stub retrieval with `search_batch` and a stub llm generating one batch at a time
+(`--llm_latency` per batch plus `--per_item` per prompt), as a local llm does.
+
+Run it inside the legacy_chains directory:
+
+    python -m benchmarks.micro_batching --n_requests 500 --arrival_rate 500 --max_batch_size 1 8 32
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Any, Dict, Optional
+
+from _chains.batching import ChainBatcher
+from _chains.retrievers import IRRetriever
+from benchmarks.stubs import SleepingBatchIRModel, SleepingBatchLLM, make_chain
+
+
+async def run(args: argparse.Namespace, max_batch_size: Optional[int]) -> Dict[str, Any]:
+    llm = SleepingBatchLLM(latency=args.llm_latency, per_item=args.per_item)
+    retriever = IRRetriever(ir_model=SleepingBatchIRModel(latency=args.retrieval_latency))
+    chain = make_chain(retriever, llm=llm)
+    batcher = None
+    if max_batch_size is not None:
+        batcher = ChainBatcher(chain, max_batch_size=max_batch_size, max_wait=args.max_wait)
+
+    latencies = []
+
+    async def request(i: int) -> None:
+        start = time.perf_counter()
+        inputs = {"question": f"question {i}"}
+        outputs = await (chain.acall(inputs) if batcher is None else batcher.acall(inputs))
+        assert outputs["question"] == inputs["question"]
+        latencies.append(time.perf_counter() - start)
+
+    rand = random.Random(0)
+    start = time.perf_counter()
+    tasks = []
+    for i in range(args.n_requests):
+        tasks += [asyncio.create_task(request(i))]
+        await asyncio.sleep(rand.expovariate(args.arrival_rate))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "elapsed": elapsed,
+        "n_batches": llm.n_batches,
+        "p50": quantiles[49],
+        "p99": quantiles[98],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n_requests", type=int, default=500)
+    parser.add_argument("--arrival_rate", type=float, default=500)
+    parser.add_argument("--max_batch_size", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max_wait", type=float, default=0.01)
+    parser.add_argument("--retrieval_latency", type=float, default=0.01)
+    parser.add_argument("--llm_latency", type=float, default=0.02)
+    parser.add_argument("--per_item", type=float, default=0.001)
+    args = parser.parse_args()
+
+    print(f"{'mode':>12} {'elapsed(s)':>10} {'requests/s':>10} {'llm batches':>11} {'p50(s)':>7} {'p99(s)':>7}")
+    for max_batch_size in [None] + args.max_batch_size:
+        result = asyncio.run(run(args, max_batch_size))
+        mode = "acall" if max_batch_size is None else f"batch<={max_batch_size}"
+        print(
+            f"{mode:>12} {result['elapsed']:>10.3f} {args.n_requests / result['elapsed']:>10.0f} "
+            f"{result['n_batches']:>11} {result['p50']:>7.3f} {result['p99']:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
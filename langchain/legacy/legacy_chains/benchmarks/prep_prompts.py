@@ -0,0 +1,75 @@
+"""Micro-benchmark formatting the prompts of IRChain, in prompts per second.
+
+Each input has `--n_docs` documents drawn from a pool of `--n_unique` documents with ids,
+as the popular documents are retrieved again and again. The documents are formatted and
+the prompt is made by `_get_inputs` and `prep_prompts`, without any llm call.
+
+Modes:
+    - baseline: parse the templates every time (compile_templates=False, doc_strings_cache_size=0)
+    - compiled: the templates compiled once
+    - compiled+cache: the templates compiled once, and the formatted documents cached by id, content and metadata
+
+Run it inside the legacy_chains directory:
+
+    python -m benchmarks.prep_prompts --n_inputs 2000 --n_docs 5
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from langchain.schema import Document
+
+from benchmarks.stubs import SleepingRetriever, make_chain
+
+MODES = {
+    "baseline": {"compile_templates": False, "doc_strings_cache_size": 0},
+    "compiled": {"compile_templates": True, "doc_strings_cache_size": 0},
+    "compiled+cache": {"compile_templates": True, "doc_strings_cache_size": 4096},
+}
+
+
+def make_docs_list(n_inputs: int, n_docs: int, n_unique: int, seed: int = 0) -> List[List[Document]]:
+    rand = random.Random(seed)
+    pool = [
+        Document(
+            page_content=f"Document {i}. " + "lorem ipsum dolor sit amet " * 40, metadata={"id": i, "title": f"t{i}"}
+        )
+        for i in range(n_unique)
+    ]
+    return [rand.sample(pool, n_docs) for _ in range(n_inputs)]
+
+
+def measure(mode: str, docs_list: List[List[Document]], repeat: int) -> Dict[str, Any]:
+    chain = make_chain(SleepingRetriever(), **MODES[mode])
+    elapsed = []
+    for _ in range(repeat):
+        input_list = [{"question": f"question {i}"} for i in range(len(docs_list))]
+        start = time.perf_counter()
+        doc_strings_list = [chain._get_inputs(docs) for docs in docs_list]
+        prompts, _ = chain.prep_prompts(input_list, doc_strings_list)
+        elapsed += [time.perf_counter() - start]
+    return {"prompts_per_sec": len(docs_list) / min(elapsed), "texts": [prompt.to_string() for prompt in prompts]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n_inputs", type=int, default=2000)
+    parser.add_argument("--n_docs", type=int, default=5)
+    parser.add_argument("--n_unique", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs_list = make_docs_list(args.n_inputs, args.n_docs, args.n_unique)
+    results = {mode: measure(mode, docs_list, args.repeat) for mode in MODES}
+    baseline = results["baseline"]
+
+    print(f"{'mode':>15} {'prompts/s':>10} {'speedup':>8} {'same output':>11}")
+    for mode, result in results.items():
+        speedup = result["prompts_per_sec"] / baseline["prompts_per_sec"]
+        same = result["texts"] == baseline["texts"]
+        print(f"{mode:>15} {result['prompts_per_sec']:>10.0f} {speedup:>7.2f}x {str(same):>11}")
+
+
+if __name__ == "__main__":
+    main()
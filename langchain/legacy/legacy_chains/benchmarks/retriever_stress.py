@@ -0,0 +1,90 @@
+"""Stress IRRetriever and ReentrantIRRetriever with hundreds of concurrent queries,
+through the executor and through `asearch` of the IR model.
+
+Every query is sent `--repeat` times at once with `asyncio.gather`, against a stub IR model
+returning the same hit objects for the same query (as an in-memory index does), with a random
+latency. Each result is checked to be the documents of its own query, and the errors
+(e.g., the hits modified in place by a previous call) are counted.
+
+Run it inside the legacy_chains directory:
+
+    python -m benchmarks.retriever_stress --n_queries 500 --repeat 2
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List
+
+from _chains.retrievers import IRRetriever, ReentrantIRRetriever
+from benchmarks.stubs import SleepingIRModel
+
+
+class JitterIRModel(SleepingIRModel):
+    """Stub IR model of which latency is random, so that the concurrent searches interleave."""
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        self.n_calls += 1
+        time.sleep(random.uniform(0, 2 * self.latency))
+        return self._hits(query, top_k)
+
+
+class AsyncJitterIRModel(JitterIRModel):
+    """Stub IR model with a native `asearch`, which waits on the event loop without any thread."""
+
+    async def asearch(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        self.n_calls += 1
+        await asyncio.sleep(random.uniform(0, 2 * self.latency))
+        return self._hits(query, top_k)
+
+
+async def stress(retriever: IRRetriever, queries: List[str]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[retriever.aget_relevant_documents(query) for query in queries], return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+
+    n_errors, n_mismatches = 0, 0
+    for query, result in zip(queries, results):
+        if isinstance(result, Exception):
+            n_errors += 1
+        elif len(result) == 0 or any(f"about {query}." not in document.page_content for document in result):
+            n_mismatches += 1
+    return {"elapsed": elapsed, "n_errors": n_errors, "n_mismatches": n_mismatches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n_queries", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--max_workers", type=int, default=64)
+    args = parser.parse_args()
+
+    queries = [f"question {i}" for i in range(args.n_queries)] * args.repeat
+    random.Random(0).shuffle(queries)
+    retrievers = {
+        "IRRetriever": (IRRetriever, JitterIRModel),
+        "ReentrantIRRetriever": (ReentrantIRRetriever, JitterIRModel),
+        "ReentrantIRRetriever+asearch": (ReentrantIRRetriever, AsyncJitterIRModel),
+    }
+
+    print(f"{'retriever':>28} {'queries':>7} {'elapsed(s)':>10} {'queries/s':>9} {'errors':>6} {'mismatches':>10}")
+    for name, (retriever_cls, ir_model_cls) in retrievers.items():
+        ir_model = ir_model_cls(latency=args.latency, reuse_hits=True)
+        if retriever_cls is ReentrantIRRetriever:
+            retriever = ReentrantIRRetriever(ir_model=ir_model, max_workers=args.max_workers)
+        else:
+            retriever = retriever_cls(ir_model=ir_model)
+        result = asyncio.run(stress(retriever, queries))
+        if isinstance(retriever, ReentrantIRRetriever):
+            retriever.shutdown()
+        print(
+            f"{name:>28} {len(queries):>7} {result['elapsed']:>10.3f} {len(queries) / result['elapsed']:>9.0f} "
+            f"{result['n_errors']:>6} {result['n_mismatches']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
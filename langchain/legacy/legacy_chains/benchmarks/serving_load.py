@@ -0,0 +1,104 @@
+"""Load ChainServer with many concurrent websocket sessions in-process, against the stub retriever
+and the stub llm streaming its answer word by word.
+
+Each session asks `--n_questions` questions one after another, and `--disconnect_ratio` of
+the sessions disconnect at the first streamed frame, which cancels their questions.
+
+Run it inside the legacy_chains directory:
+
+    python -m benchmarks.serving_load --n_sessions 200 --max_in_flight 16 64
+    # serve the stub chains on a real websocket (requires websockets)
+    python -m benchmarks.serving_load --serve --port 8000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict
+
+from _chains.serving import ChainServer
+from benchmarks.stubs import FakeSessionWebSocket, SleepingRetriever, SleepingStreamingLLM, make_chain
+
+
+def make_server(args: argparse.Namespace, max_in_flight: int) -> ChainServer:
+    chains = [
+        make_chain(
+            SleepingRetriever(latency=args.retrieval_latency),
+            llm=SleepingStreamingLLM(latency=args.llm_latency, token_interval=args.token_interval),
+        )
+        for _ in range(args.n_chains)
+    ]
+    return ChainServer(
+        chains,
+        max_in_flight=max_in_flight,
+        streaming_kwargs={"max_frame_size": args.max_frame_size, "flush_interval": args.flush_interval},
+    )
+
+
+async def client(websocket: FakeSessionWebSocket, n_questions: int, disconnect: bool) -> None:
+    for i in range(n_questions):
+        websocket.client_send(json.dumps({"question": f"question {i}", "id": i}))
+        while True:
+            message = json.loads(await websocket.client_recv())
+            if disconnect and message["type"] == "stream":
+                websocket.client_close()
+                return
+            if message["type"] in ("end", "error"):
+                break
+    websocket.client_close()
+
+
+async def load(args: argparse.Namespace, max_in_flight: int) -> Dict[str, Any]:
+    server = make_server(args, max_in_flight)
+    rand = random.Random(0)
+    websockets = [FakeSessionWebSocket(latency=args.send_latency) for _ in range(args.n_sessions)]
+    start = time.perf_counter()
+    sessions = [asyncio.create_task(server.handle(websocket)) for websocket in websockets]
+    await asyncio.gather(
+        *[client(websocket, args.n_questions, rand.random() < args.disconnect_ratio) for websocket in websockets]
+    )
+    await asyncio.gather(*sessions)
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "stats": server.stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n_sessions", type=int, default=200)
+    parser.add_argument("--n_questions", type=int, default=3)
+    parser.add_argument("--disconnect_ratio", type=float, default=0.1)
+    parser.add_argument("--max_in_flight", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--n_chains", type=int, default=4)
+    parser.add_argument("--retrieval_latency", type=float, default=0.02)
+    parser.add_argument("--llm_latency", type=float, default=0.05)
+    parser.add_argument("--token_interval", type=float, default=0.005)
+    parser.add_argument("--send_latency", type=float, default=0.001)
+    parser.add_argument("--max_frame_size", type=int, default=32)
+    parser.add_argument("--flush_interval", type=float, default=0.02)
+    parser.add_argument("--serve", action="store_true", help="serve the stub chains on a websocket instead")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(make_server(args, args.max_in_flight[0]).serve(args.host, args.port))
+        return
+
+    print(
+        f"{'in-flight':>9} {'elapsed(s)':>10} {'answers/s':>9} {'completed':>9} {'cancelled':>9} {'rejected':>8} "
+        f"{'peak':>5} {'ttft p50':>8} {'ttft p99':>8} {'total p50':>9} {'total p99':>9}"
+    )
+    for max_in_flight in args.max_in_flight:
+        result = asyncio.run(load(args, max_in_flight))
+        stats = result["stats"]
+        ttft, total = stats.ttft.summary(), stats.total.summary()
+        print(
+            f"{max_in_flight:>9} {result['elapsed']:>10.3f} {stats.n_completed / result['elapsed']:>9.0f} "
+            f"{stats.n_completed:>9} {stats.n_cancelled:>9} {stats.n_rejected:>8} {stats.max_in_flight:>5} "
+            f"{ttft['p50']:>8.3f} {ttft['p99']:>8.3f} {total['p50']:>9.3f} {total['p99']:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark streaming the llm tokens through a fake websocket, of which each send takes `--latency` seconds.
+
+For each handler, the llm emits `--n_tokens` tokens as fast as it can (or one per `--token_interval`
+seconds), and the benchmark measures how long the llm is stalled by the callbacks, how long until
+the client receives the last token, the number of frames, and the tokens dropped.
+
+Run it inside the legacy_chains directory:
+
+    python -m benchmarks.streaming_throughput --n_tokens 1000 --latency 0.005 --token_interval 0.001
+    # a client falling behind: the llm as fast as it can, the queue small
+    python -m benchmarks.streaming_throughput --token_interval 0 --max_queue_size 64
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict
+
+from _chains.callbacks import BufferedStreamingCallbackHandler, StreamingLLMCallbackHandler
+from benchmarks.stubs import FakeWebSocket
+
+
+async def stream(handler_name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    websocket = FakeWebSocket(latency=args.latency)
+    if handler_name == "unbuffered":
+        handler = StreamingLLMCallbackHandler(websocket)
+    else:
+        handler = BufferedStreamingCallbackHandler(
+            websocket,
+            max_queue_size=args.max_queue_size,
+            max_frame_size=args.max_frame_size,
+            flush_interval=args.flush_interval,
+            policy=handler_name.split(":")[1],
+        )
+    tokens = [f"tok{i} " for i in range(args.n_tokens)]
+
+    start = time.perf_counter()
+    for token in tokens:
+        await handler.on_llm_new_token(token)
+        if args.token_interval > 0:
+            await asyncio.sleep(args.token_interval)
+        else:
+            # let the other tasks run, as the llm awaits the network between the tokens
+            await asyncio.sleep(0)
+    generated = time.perf_counter() - start
+    if isinstance(handler, BufferedStreamingCallbackHandler):
+        await handler.aclose()
+    delivered = time.perf_counter() - start
+
+    received = "".join(websocket.frames)
+    return {
+        "generated": generated,
+        "delivered": delivered,
+        "n_frames": len(websocket.frames),
+        "n_dropped": handler.stats.n_dropped if isinstance(handler, BufferedStreamingCallbackHandler) else 0,
+        "complete": received == "".join(tokens),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n_tokens", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--token_interval", type=float, default=0.001)
+    parser.add_argument("--max_queue_size", type=int, default=1024)
+    parser.add_argument("--max_frame_size", type=int, default=64)
+    parser.add_argument("--flush_interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(
+        f"{'handler':>20} {'llm stalled(s)':>14} {'delivered(s)':>12} {'tokens/s':>9} "
+        f"{'frames':>7} {'dropped':>7} {'complete':>8}"
+    )
+    for handler_name in ["unbuffered", "buffered:drop", "buffered:disconnect"]:
+        result = asyncio.run(stream(handler_name, args))
+        print(
+            f"{handler_name:>20} {result['generated']:>14.3f} {result['delivered']:>12.3f} "
+            f"{args.n_tokens / result['delivered']:>9.0f} {result['n_frames']:>7} {result['n_dropped']:>7} "
+            f"{str(result['complete']):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Stub IR model, retriever and llm which only sleep, to benchmark IRChain without any backend."""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.callbacks.manager import (
+    AsyncCallbackManagerForLLMRun,
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForLLMRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain.llms.base import LLM
+from langchain.llms.fake import FakeListLLM
+from langchain.prompts import PromptTemplate
+from pydantic import PrivateAttr
+from langchain.schema import BaseRetriever, Document, Generation, LLMResult
+from langchain.schema.language_model import BaseLanguageModel
+
+from _chains.chains import IRChain
+from _chains.prompts import DOCUMENT_PROMPT
+
+PROMPT = PromptTemplate.from_template(
+    "Answer the best as you can given the context: \n{context}\nAnswer the question: \n{question}"
+)
+
+
+class SleepingIRModel(object):
+    """IR model of which search takes `latency` seconds, as a remote search engine does.
+    If `reuse_hits`, the same hit objects are returned for the same query, as an in-memory index does."""
+
+    def __init__(self, latency: float = 0.05, n_docs: int = 20, reuse_hits: bool = False):
+        self.latency = latency
+        self.n_docs = n_docs
+        self.reuse_hits = reuse_hits
+        self.n_calls = 0
+        self._store: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+
+    def _hits(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        if self.reuse_hits and (query, top_k) in self._store:
+            return list(self._store[(query, top_k)])
+        hits = [
+            {"context": f"Document {i} about {query}. " * 5, "title": f"title {i}", "score": 1.0 / (i + 1)}
+            for i in range(min(top_k, self.n_docs))
+        ]
+        if self.reuse_hits:
+            self._store[(query, top_k)] = hits
+        return list(hits)
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        self.n_calls += 1
+        time.sleep(self.latency)
+        return self._hits(query, top_k)
+
+
+class SleepingBatchIRModel(SleepingIRModel):
+    """IR model supporting `search_batch`, which answers all the queries in a single round trip."""
+
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        self.n_calls += 1
+        time.sleep(self.latency)
+        return [self._hits(query, top_k) for query in queries]
+
+
+class SleepingRetriever(BaseRetriever):
+    """Retriever of which retrieval takes `latency` seconds, natively async."""
+
+    latency: float = 0.05
+    top_k: int = 5
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun = None
+    ) -> List[Document]:
+        time.sleep(self.latency)
+        return self._documents(query)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun = None
+    ) -> List[Document]:
+        await asyncio.sleep(self.latency)
+        return self._documents(query)
+
+    def _documents(self, query: str) -> List[Document]:
+        return [
+            Document(page_content=f"Document {i} about {query}.", metadata={"title": f"title {i}"})
+            for i in range(self.top_k)
+        ]
+
+
+class SleepingStreamingLLM(LLM):
+    """LLM which answers the same words after `latency` seconds, streaming a word per `token_interval` seconds."""
+
+    answer: str = "This is a stub answer streamed word by word to the client."
+    latency: float = 0.05
+    token_interval: float = 0.005
+
+    @property
+    def _llm_type(self) -> str:
+        return "sleeping-streaming"
+
+    def _tokens(self) -> List[str]:
+        return [word + " " for word in self.answer.split()]
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        time.sleep(self.latency + self.token_interval * len(self._tokens()))
+        return "".join(self._tokens())
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens():
+            await asyncio.sleep(self.token_interval)
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(token)
+        return "".join(self._tokens())
+
+
+class SleepingBatchLLM(LLM):
+    """LLM generating one batch at a time, as a local llm on a single device does: a batch takes
+    `latency` seconds plus `per_item` seconds per prompt, so that the larger batches are cheaper per prompt."""
+
+    latency: float = 0.05
+    per_item: float = 0.002
+    n_batches: int = 0
+    _lock: Optional[asyncio.Lock] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "sleeping-batch"
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        time.sleep(self.latency + self.per_item)
+        return "stub answer"
+
+    async def _agenerate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self.n_batches += 1
+            await asyncio.sleep(self.latency + self.per_item * len(prompts))
+        return LLMResult(generations=[[Generation(text=f"stub answer {i}")] for i in range(len(prompts))])
+
+
+class FakeWebSocket(object):
+    """WebSocket of which each send takes `latency` seconds plus `per_char` seconds per character,
+    as a client on a slow network does. The frames sent are kept to check what the client receives."""
+
+    def __init__(self, latency: float = 0.001, per_char: float = 0.0):
+        self.latency = latency
+        self.per_char = per_char
+        self.frames: List[str] = []
+        self.closed = False
+
+    async def send(self, message: str) -> None:
+        if self.closed:
+            raise ConnectionError("websocket is closed")
+        await asyncio.sleep(self.latency + self.per_char * len(message))
+        self.frames.append(message)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeSessionWebSocket(FakeWebSocket):
+    """Server side of a websocket session, of which client sends the messages by `client_send`,
+    receives them by `client_recv`, and disconnects by `client_close`."""
+
+    def __init__(self, latency: float = 0.001, per_char: float = 0.0):
+        super().__init__(latency=latency, per_char=per_char)
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._outbox: asyncio.Queue = asyncio.Queue()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        message = await self._inbox.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def send(self, message: str) -> None:
+        await super().send(message)
+        self._outbox.put_nowait(message)
+
+    def client_send(self, message: str) -> None:
+        self._inbox.put_nowait(message)
+
+    async def client_recv(self) -> str:
+        return await self._outbox.get()
+
+    def client_close(self) -> None:
+        self.closed = True
+        self._inbox.put_nowait(None)
+
+
+def make_chain(retriever: BaseRetriever, llm: Optional[BaseLanguageModel] = None, **kwargs: Any) -> IRChain:
+    llm = llm or FakeListLLM(responses=["stub answer"])
+    return IRChain(prompt=PROMPT, document_prompt=DOCUMENT_PROMPT, llm=llm, retriever=retriever, **kwargs)